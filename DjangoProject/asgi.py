@@ -3,6 +3,9 @@ ASGI config for DjangoProject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The lifespan events start and stop the shared, pooled backend client
+(core/backend_client.py) that the async views in core use.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -13,4 +16,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DjangoProject.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up
+from django.conf import settings  # noqa: E402
+from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+
+from core import backend_client  # noqa: E402
+
+if settings.DEBUG:
+    # uvicorn does not serve static files like runserver does
+    django_application = ASGIStaticFilesHandler(django_application)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await backend_client.lifespan(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
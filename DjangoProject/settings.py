@@ -35,6 +35,12 @@ LOCALE_PATHS = [
     BASE_DIR / 'locale',
 ]
 
+# LANGUAGE_COOKIE_AGE is also used by core.views.i18n_fragments
+LANGUAGE_COOKIE_AGE = 365 * 24 * 3600
+
+# translated page regions for switching language without a reload (core/fragments.py)
+I18N_FRAGMENT_CACHE_TIMEOUT = 3600
+
 TIME_ZONE = 'UTC'
 
 # ---------------------------------------------------------------------
@@ -56,6 +62,9 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ---------------------------------------------------------------------
 MIDDLEWARE = [
+    # трассировка должна оборачивать весь остальной стек
+    'core.tracing.TraceMiddleware',
+
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
 
@@ -91,6 +100,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'DjangoProject.wsgi.application'
+ASGI_APPLICATION = 'DjangoProject.asgi.application'
 
 # ---------------------------------------------------------------------
 # DATABASE
@@ -121,6 +131,74 @@ STATICFILES_DIRS = [
     BASE_DIR / 'core' / 'static',
 ]
 
+# ---------------------------------------------------------------------
+# TRACING (browser -> Django -> backend, see core/tracing.py)
+# ---------------------------------------------------------------------
+TRACE_ENABLED = True
+TRACE_EXPORT_PATH = BASE_DIR / 'traces' / 'spans.jsonl'
+TRACE_EXPORT_MAX_BYTES = 5 * 1024 * 1024
+TRACE_EXPORT_BACKUP_COUNT = 3
+# OTLP/HTTP JSON collector, e.g. 'http://localhost:4318/v1/traces'
+TRACE_OTLP_ENDPOINT = None
+TRACE_EXCLUDE_PATHS = ('/static/', '/trace/', '/admin/')
+
+# ---------------------------------------------------------------------
+# BACKEND (FastAPI) + ADMISSION CONTROL (see core/admission.py)
+# ---------------------------------------------------------------------
+BACKEND_API_BASE_URL = 'http://localhost:8000'
+BACKEND_TIMEOUT = 180  # CV analysis and scraping take 30-60 s
+BACKEND_CONNECT_TIMEOUT = 5
+
+# pooled client started by the ASGI lifespan (core/backend_client.py)
+BACKEND_POOL_MAX_CONNECTIONS = 20
+BACKEND_POOL_MAX_KEEPALIVE = 10
+BACKEND_POOL_KEEPALIVE_EXPIRY = 30
+BACKEND_HTTP2 = False  # needs the h2 package: pip install "httpx[http2]"
+BACKEND_HEALTH_PATH = '/'
+BACKEND_HEALTH_INTERVAL = 10
+
+# circuit breaker: fail fast while the backend is down
+BACKEND_BREAKER_FAILURE_THRESHOLD = 5
+BACKEND_BREAKER_RESET_TIMEOUT = 15
+
+# rate/burst: per-user token bucket (requests per second / max burst)
+# expected_duration: initial guess (s) for queue ETAs, learned at runtime
+ADMISSION_BACKENDS = {
+    'llm': {
+        'max_concurrency': 1,
+        'queue_limit': 20,
+        'per_user_queue_limit': 1,
+        'rate': 1 / 10,
+        'burst': 3,
+        'expected_duration': 30,
+    },
+    'scraper': {
+        'max_concurrency': 1,
+        'queue_limit': 10,
+        'per_user_queue_limit': 1,
+        'rate': 1 / 20,
+        'burst': 2,
+        'expected_duration': 40,
+    },
+}
+# seconds a granted ticket keeps its slot before the client re-sends
+ADMISSION_GRANT_TIMEOUT = 15
+# seconds without polling before a waiting ticket is dropped
+ADMISSION_ABANDON_TIMEOUT = 20
+
+# ---------------------------------------------------------------------
+# JOB PREFETCH AFTER CV UPLOAD (see core/prefetch.py)
+# ---------------------------------------------------------------------
+PREFETCH_ENABLED = True
+PREFETCH_DEFAULT_CITY = 'Heilbronn'
+PREFETCH_MAX_WORKERS = 1
+# give up if the scraper does not become idle within this many seconds
+PREFETCH_START_TIMEOUT = 60
+# seconds a finished prefetch can still be used
+PREFETCH_TTL = 600
+# last city searched on the positions page
+JOB_CITY_COOKIE = 'cv_job_city'
+
 # ---------------------------------------------------------------------
 # DEFAULT FIELD TYPE
 # ---------------------------------------------------------------------
@@ -0,0 +1,355 @@
+"""
+Admission control in front of the slow backends (LLM and LinkedIn scraper).
+
+Each backend gets
+- a token bucket per client, so one client cannot spam a backend,
+- a bounded limit of requests running at the same time,
+- a bounded queue that hands out free slots round-robin per client.
+
+Clients are identified by their address (see client_key()). Django cannot
+verify the bearer token - the backend holds the JWT secret - and a client
+could send a different made-up token with every request to get a fresh
+bucket and queue turn. Users behind one NAT or proxy share a quota.
+
+A request that cannot run right away gets a ticket and a 202 response with
+its queue position and ETA. The client polls the ticket, and once it is
+granted it repeats the request with the ``X-Admission-Ticket`` header.
+Requests never wait inside a worker, so an overloaded backend shows up as
+queue positions (or a fast 503 when the queue is full) instead of workers
+piling up.
+
+The state lives in process memory, which matches the single-process
+``runserver`` / ASGI setup of this project.
+"""
+import asyncio
+import hashlib
+import math
+import secrets
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+ADMITTED = 'admitted'
+QUEUED = 'queued'
+GRANTED = 'ready'
+REJECTED = 'overloaded'
+THROTTLED = 'throttled'
+EXPIRED = 'expired'
+
+TICKET_HEADER = 'X-Admission-Ticket'
+
+
+class Decision:
+    def __init__(self, state, ticket=None, position=None, eta=None, retry_after=None):
+        self.state = state
+        self.ticket = ticket
+        self.position = position
+        self.eta = eta
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def full(self, now):
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+    def take(self):
+        """Take a token; return 0 on success or the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class Ticket:
+    def __init__(self, user):
+        self.id = secrets.token_urlsafe(12)
+        self.user = user
+        self.last_seen = time.monotonic()
+        self.granted_at = None
+
+
+class AdmissionController:
+    def __init__(self, name, max_concurrency, queue_limit, per_user_queue_limit,
+                 rate, burst, expected_duration):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.queue_limit = queue_limit
+        self.per_user_queue_limit = per_user_queue_limit
+        self.rate = rate
+        self.burst = burst
+        self.avg_duration = expected_duration
+
+        self._lock = threading.Lock()
+        self.active = 0
+        self.buckets = {}
+        self.queues = {}        # user -> deque of waiting tickets
+        self.round_robin = deque()  # users with waiting tickets, next one first
+        self.waiting = {}       # ticket id -> waiting ticket
+        self.granted = {}       # ticket id -> ticket holding a reserved slot
+
+    # -- public API ---------------------------------------------------
+    def admit(self, user, ticket_id=None):
+        """Run now, queue, or refuse a request.
+
+        Only a ticket this user holds skips the token bucket; an unknown or
+        expired ticket is a new request like one without a ticket.
+        """
+        with self._lock:
+            self._expire()
+
+            ticket = self.granted.get(ticket_id)
+            if ticket is not None and ticket.user == user:
+                del self.granted[ticket_id]
+                self.active += 1
+                return Decision(ADMITTED)
+
+            ticket = self.waiting.get(ticket_id)
+            if ticket is not None and ticket.user == user:
+                ticket.last_seen = time.monotonic()
+                return self._queued(ticket)
+
+            wait = self._take_token(user)
+            if wait:
+                return Decision(THROTTLED, retry_after=wait)
+
+            if not self.waiting and self._free_slots() > 0:
+                self.active += 1
+                return Decision(ADMITTED)
+
+            if len(self.waiting) >= self.queue_limit:
+                return Decision(REJECTED, retry_after=self._eta(len(self.waiting)))
+            if len(self.queues.get(user, ())) >= self.per_user_queue_limit:
+                return Decision(THROTTLED, retry_after=self._eta(len(self.waiting)))
+
+            ticket = Ticket(user)
+            self.waiting[ticket.id] = ticket
+            if user not in self.queues:
+                self.queues[user] = deque()
+                self.round_robin.append(user)
+            self.queues[user].append(ticket)
+            return self._queued(ticket)
+
+    def try_admit_idle(self):
+        """Take a slot only if it is free and nobody is waiting (low-priority work)."""
+        with self._lock:
+            self._expire()
+            if self.waiting or self._free_slots() <= 0:
+                return False
+            self.active += 1
+            return True
+
+    def status(self, user, ticket_id):
+        """Poll a ticket: still queued (with position), granted, or expired."""
+        with self._lock:
+            self._expire()
+            ticket = self.granted.get(ticket_id)
+            if ticket is not None and ticket.user == user:
+                return Decision(GRANTED, ticket=ticket.id)
+            ticket = self.waiting.get(ticket_id)
+            if ticket is not None and ticket.user == user:
+                ticket.last_seen = time.monotonic()
+                return self._queued(ticket)
+            return Decision(EXPIRED)
+
+    def release(self, duration=None):
+        with self._lock:
+            self.active = max(0, self.active - 1)
+            if duration is not None:
+                # Exponential moving average of how long one request holds a slot
+                self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+            self._dispatch()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'backend': self.name,
+                'active': self.active,
+                'granted': len(self.granted),
+                'waiting': len(self.waiting),
+                'max_concurrency': self.max_concurrency,
+                'avg_duration': round(self.avg_duration, 2),
+            }
+
+    # -- internals (call with the lock held) ------------------------------
+    def _take_token(self, user):
+        """Seconds the user has to wait before a new request, 0 if allowed."""
+        bucket = self.buckets.get(user)
+        if bucket is None:
+            bucket = self.buckets[user] = TokenBucket(self.rate, self.burst)
+        return bucket.take()
+
+    def _free_slots(self):
+        return self.max_concurrency - self.active - len(self.granted)
+
+    def _dispatch(self):
+        while self._free_slots() > 0 and self.round_robin:
+            user = self.round_robin.popleft()
+            ticket = self.queues[user].popleft()
+            if self.queues[user]:
+                self.round_robin.append(user)
+            else:
+                del self.queues[user]
+            del self.waiting[ticket.id]
+            ticket.granted_at = time.monotonic()
+            self.granted[ticket.id] = ticket
+
+    def _expire(self):
+        now = time.monotonic()
+        for ticket_id, ticket in list(self.granted.items()):
+            if now - ticket.granted_at > settings.ADMISSION_GRANT_TIMEOUT:
+                del self.granted[ticket_id]
+
+        # Buckets that refilled completely are the same as new ones
+        for user, bucket in list(self.buckets.items()):
+            if bucket.full(now):
+                del self.buckets[user]
+
+        abandoned = [t for t in self.waiting.values()
+                     if now - t.last_seen > settings.ADMISSION_ABANDON_TIMEOUT]
+        for ticket in abandoned:
+            del self.waiting[ticket.id]
+            self.queues[ticket.user].remove(ticket)
+            if not self.queues[ticket.user]:
+                del self.queues[ticket.user]
+                self.round_robin.remove(ticket.user)
+
+        self._dispatch()
+
+    def _position(self, ticket):
+        """1-based place of the ticket in round-robin dispatch order."""
+        index = self.queues[ticket.user].index(ticket)
+        ahead = 0
+        before_us = True
+        for user in self.round_robin:
+            if user == ticket.user:
+                before_us = False
+                ahead += index
+                continue
+            # Users earlier in the rotation get index + 1 turns before ours, later users index turns
+            turns = index + 1 if before_us else index
+            ahead += min(len(self.queues[user]), turns)
+        return ahead + 1
+
+    def _eta(self, position):
+        rounds = math.ceil(position / self.max_concurrency)
+        return max(1, round(rounds * self.avg_duration))
+
+    def _queued(self, ticket):
+        position = self._position(ticket)
+        return Decision(QUEUED, ticket=ticket.id, position=position, eta=self._eta(position))
+
+
+_controllers = {}
+_controllers_lock = threading.Lock()
+
+
+def get_controller(backend):
+    with _controllers_lock:
+        if backend not in _controllers:
+            _controllers[backend] = AdmissionController(backend, **settings.ADMISSION_BACKENDS[backend])
+        return _controllers[backend]
+
+
+def client_key(request):
+    """Who admission quotas are counted for: the client address.
+
+    Set by the server (runserver/uvicorn), not by a header the client
+    controls. Behind a reverse proxy this is the proxy's address.
+    """
+    return 'ip:' + request.META.get('REMOTE_ADDR', '')
+
+
+def user_key(request):
+    """Identify the caller: the bearer token if signed in, otherwise the client address.
+
+    Not verified here, so only use it to keep one user's data apart from
+    another's (job prefetch), never for quotas.
+    """
+    auth = request.headers.get('Authorization', '')
+    if auth.startswith('Bearer '):
+        return 'token:' + hashlib.sha256(auth[7:].encode()).hexdigest()[:16]
+    return 'ip:' + request.META.get('REMOTE_ADDR', '')
+
+
+def decision_response(backend, decision):
+    body = {'status': decision.state, 'backend': backend}
+    if decision.state == QUEUED:
+        body.update({
+            'ticket': decision.ticket,
+            'position': decision.position,
+            'eta_seconds': decision.eta,
+            'poll_url': f'/api/queue/{backend}/{decision.ticket}/',
+        })
+        return JsonResponse(body, status=202)
+    if decision.state == GRANTED:
+        body['ticket'] = decision.ticket
+        return JsonResponse(body)
+    if decision.state == EXPIRED:
+        body['detail'] = 'Ticket expired, please send the request again.'
+        return JsonResponse(body, status=404)
+
+    retry_after = max(1, math.ceil(decision.retry_after or 1))
+    if decision.state == THROTTLED:
+        body['detail'] = 'Too many requests. Please wait a moment before trying again.'
+        status = 429
+    else:
+        body['detail'] = 'The service is busy right now. Please try again shortly.'
+        status = 503
+    body['retry_after'] = retry_after
+    response = JsonResponse(body, status=status)
+    response['Retry-After'] = str(retry_after)
+    return response
+
+
+def _enter(backend, request):
+    """Admit the request; return a response if it has to wait or is refused."""
+    decision = get_controller(backend).admit(client_key(request), request.headers.get(TICKET_HEADER))
+    if decision.state != ADMITTED:
+        return decision_response(backend, decision)
+    return None
+
+
+def admission(backend):
+    """Run the view only once the backend has a free slot for this user.
+
+    Works for sync and async views; admission itself never blocks.
+    """
+    def decorator(view):
+        if asyncio.iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapped(request, *args, **kwargs):
+                refused = _enter(backend, request)
+                if refused is not None:
+                    return refused
+                started = time.monotonic()
+                try:
+                    return await view(request, *args, **kwargs)
+                finally:
+                    get_controller(backend).release(time.monotonic() - started)
+            return async_wrapped
+
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            refused = _enter(backend, request)
+            if refused is not None:
+                return refused
+            started = time.monotonic()
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                get_controller(backend).release(time.monotonic() - started)
+        return wrapped
+    return decorator
@@ -0,0 +1,251 @@
+"""
+Server-side calls from the Django tier to the FastAPI backend.
+
+This is the synchronous path (WSGI, background threads such as the job
+prefetch). Async views use the pooled client in core/backend_client.py
+when it was started by the ASGI lifespan. Both paths share the circuit
+breaker and the metrics below, so a backend outage fails fast everywhere.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+
+from . import tracing
+
+logger = logging.getLogger(__name__)
+
+# Request headers passed through to the backend
+FORWARDED_HEADERS = ('Authorization', 'Content-Type', 'Accept', 'Accept-Language')
+
+# Backend responses that count as the backend being down
+UNAVAILABLE_STATUSES = (502, 503, 504)
+
+_session = requests.Session()
+
+
+class BackendUnavailable(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """Stop calling the backend after repeated failures, probe again after a pause.
+
+    closed -> open after BACKEND_BREAKER_FAILURE_THRESHOLD consecutive failures,
+    open -> half-open after BACKEND_BREAKER_RESET_TIMEOUT seconds (one probe call),
+    half-open -> closed on success, back to open on failure.
+
+    Only real calls close the circuit. A passing health check just lets an
+    open circuit probe early: the health endpoint can answer while the slow
+    endpoints keep failing. A probe that ends without an answer (cancelled
+    because the client went away, unexpected error) opens the circuit again.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._probe_started = None
+
+    def allow(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < settings.BACKEND_BREAKER_RESET_TIMEOUT:
+                    return False
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+                self._probe_started = time.monotonic()
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_health_ok(self):
+        with self._lock:
+            stale_probe = (self.state == self.HALF_OPEN and self._probing
+                           and time.monotonic() - self._probe_started > settings.BACKEND_TIMEOUT)
+            if self.state == self.OPEN or stale_probe:
+                self.state = self.HALF_OPEN
+                self._probing = False
+
+    def abort_probe(self):
+        """The call ended without a result; if it was the probe, open the circuit again."""
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._probing:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= settings.BACKEND_BREAKER_FAILURE_THRESHOLD:
+                if self.state != self.OPEN:
+                    logger.warning('Backend circuit opened after %d failures', self.failures)
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self._lock:
+            return {'state': self.state, 'consecutive_failures': self.failures}
+
+
+class BackendMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.rejected = 0  # refused because the circuit was open
+        self.in_flight = 0
+        self.total_ms = 0.0
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+
+    def finished(self, duration, failed):
+        with self._lock:
+            self.in_flight -= 1
+            self.total_ms += duration * 1000
+            if failed:
+                self.failures += 1
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'failures': self.failures,
+                'rejected_circuit_open': self.rejected,
+                'in_flight': self.in_flight,
+                'avg_ms': round(self.total_ms / self.requests, 1) if self.requests else None,
+            }
+
+
+breaker = CircuitBreaker()
+metrics = BackendMetrics()
+
+
+def backend_url(path):
+    return f"{settings.BACKEND_API_BASE_URL.rstrip('/')}/{path.lstrip('/')}"
+
+
+def forwarded_headers(request):
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    if request.content_type == 'multipart/form-data':
+        # The body is re-encoded by forwarded_body() with a new boundary
+        headers.pop('Content-Type', None)
+    return headers
+
+
+def forwarded_body(request):
+    """Return ``(data, files)`` to send on to the backend.
+
+    Multipart uploads (the CV from chat.js) are rebuilt from request.POST and
+    request.FILES: once CsrfViewMiddleware has parsed the form, the raw body
+    can no longer be read.
+    """
+    if request.content_type == 'multipart/form-data':
+        data = {key: request.POST.getlist(key) for key in request.POST}
+        files = [
+            (name, (upload.name, upload.read(), upload.content_type))
+            for name in request.FILES
+            for upload in request.FILES.getlist(name)
+        ]
+        return data, files
+    return request.body or None, None
+
+
+def call(method, path, headers=None, params=None, data=None, files=None):
+    """Call the backend and return the ``requests.Response``.
+
+    Raises BackendUnavailable if the backend cannot be reached or the
+    circuit breaker is open.
+    """
+    if not breaker.allow():
+        metrics.reject()
+        raise BackendUnavailable('circuit open')
+
+    url = backend_url(path)
+    headers = dict(headers or {})
+    started = time.monotonic()
+    failed = True
+    metrics.started()
+    try:
+        with tracing.backend_span(method, url) as span:
+            tracing.inject_headers(headers)
+            try:
+                resp = _session.request(
+                    method,
+                    url,
+                    params=params,
+                    data=data,
+                    files=files,
+                    headers=headers,
+                    timeout=(settings.BACKEND_CONNECT_TIMEOUT, settings.BACKEND_TIMEOUT),
+                )
+            except requests.RequestException as exc:
+                logger.warning('Backend call %s %s failed: %s', method, url, exc)
+                span.status = 'error'
+                breaker.record_failure()
+                raise BackendUnavailable(str(exc)) from exc
+            except BaseException:
+                breaker.abort_probe()
+                raise
+            span.attributes['http.status_code'] = resp.status_code
+        failed = record_status(resp.status_code)
+        return resp
+    finally:
+        metrics.finished(time.monotonic() - started, failed)
+
+
+def record_status(status_code):
+    """Feed a backend response into the breaker; return True if it counts as a failure."""
+    if status_code in UNAVAILABLE_STATUSES:
+        breaker.record_failure()
+        return True
+    breaker.record_success()
+    return False
+
+
+def unavailable_response():
+    return JsonResponse({'detail': 'Backend service is unavailable.'}, status=502)
+
+
+def proxy(request, path):
+    """Forward the incoming request to the backend and relay its response."""
+    data, files = forwarded_body(request)
+    try:
+        resp = call(request.method, path, forwarded_headers(request),
+                    params=request.GET, data=data, files=files)
+    except BackendUnavailable:
+        return unavailable_response()
+    return relay(resp)
+
+
+def relay(resp):
+    return HttpResponse(
+        resp.content,
+        status=resp.status_code,
+        content_type=resp.headers.get('Content-Type', 'application/json'),
+    )
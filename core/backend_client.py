@@ -0,0 +1,185 @@
+"""
+Shared, pooled async HTTP client for calls from the Django tier to the backend.
+
+Started and stopped by the ASGI lifespan (DjangoProject/asgi.py), so all
+async views reuse keep-alive connections (HTTP/2 if BACKEND_HTTP2 is set
+and the h2 package is installed) instead of opening one per call. A
+background task checks the backend's health and feeds the shared circuit
+breaker in core.backend.
+
+Without a lifespan (WSGI, ``runserver``) the shared client is not running
+and calls fall back to the synchronous client in core.backend.
+"""
+import asyncio
+import logging
+import time
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import backend, tracing
+
+logger = logging.getLogger(__name__)
+
+
+class BackendClient:
+    def __init__(self):
+        self.client = None
+        self.loop = None
+        self.http2 = False  # what start() actually enabled
+        self._health_task = None
+        self.health = {'ok': None, 'checked_at': None}
+
+    async def start(self):
+        http2 = settings.BACKEND_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning('BACKEND_HTTP2 is set but h2 is not installed, using HTTP/1.1')
+                http2 = False
+
+        self.client = httpx.AsyncClient(
+            base_url=settings.BACKEND_API_BASE_URL,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=settings.BACKEND_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.BACKEND_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.BACKEND_POOL_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(settings.BACKEND_TIMEOUT, connect=settings.BACKEND_CONNECT_TIMEOUT),
+        )
+        self.http2 = http2
+        self.loop = asyncio.get_running_loop()
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info('Backend client started for %s', settings.BACKEND_API_BASE_URL)
+
+    async def stop(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+        if self.client is not None:
+            await self.client.aclose()
+        self.client = None
+        self.loop = None
+        self.http2 = False
+
+    def running(self):
+        """True if the pool was started on the event loop we are running on."""
+        if self.client is None:
+            return False
+        try:
+            return asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            return False
+
+    async def request(self, method, path, headers=None, params=None, data=None, files=None):
+        """Call the backend; returns a response with status_code, headers, content and json().
+
+        Raises backend.BackendUnavailable like the synchronous client.
+        """
+        if not self.running():
+            return await sync_to_async(backend.call, thread_sensitive=False)(
+                method, path, headers, params=params, data=data, files=files)
+
+        if not backend.breaker.allow():
+            backend.metrics.reject()
+            raise backend.BackendUnavailable('circuit open')
+
+        headers = dict(headers or {})
+        body = {'data': data, 'files': files} if files is not None else {'content': data}
+        started = time.monotonic()
+        failed = True
+        backend.metrics.started()
+        try:
+            with tracing.backend_span(method, backend.backend_url(path)) as span:
+                tracing.inject_headers(headers)
+                try:
+                    resp = await self.client.request(method, '/' + path.lstrip('/'),
+                                                     headers=headers, params=params, **body)
+                except httpx.HTTPError as exc:
+                    logger.warning('Backend call %s %s failed: %s', method, path, exc)
+                    span.status = 'error'
+                    backend.breaker.record_failure()
+                    raise backend.BackendUnavailable(str(exc)) from exc
+                except BaseException:
+                    # Cancelled (client disconnected) or unexpected error: no verdict on the backend
+                    backend.breaker.abort_probe()
+                    raise
+                span.attributes['http.status_code'] = resp.status_code
+            failed = backend.record_status(resp.status_code)
+            return resp
+        finally:
+            backend.metrics.finished(time.monotonic() - started, failed)
+
+    async def check_health(self):
+        try:
+            resp = await self.client.get(settings.BACKEND_HEALTH_PATH, timeout=settings.BACKEND_CONNECT_TIMEOUT)
+            ok = resp.status_code < 500
+        except httpx.HTTPError:
+            ok = False
+        if ok:
+            backend.breaker.record_health_ok()
+        else:
+            backend.breaker.record_failure()
+        self.health = {'ok': ok, 'checked_at': time.time()}
+
+    async def _health_loop(self):
+        while True:
+            await self.check_health()
+            await asyncio.sleep(settings.BACKEND_HEALTH_INTERVAL)
+
+    def snapshot(self):
+        pool = {
+            'running': self.client is not None,
+            'max_connections': settings.BACKEND_POOL_MAX_CONNECTIONS,
+            'max_keepalive_connections': settings.BACKEND_POOL_MAX_KEEPALIVE,
+            'http2': self.http2,
+        }
+        # httpx has no public pool statistics; read them from the transport if available
+        transport_pool = getattr(getattr(self.client, '_transport', None), '_pool', None)
+        connections = getattr(transport_pool, 'connections', None)
+        if connections is not None:
+            pool['open_connections'] = len(connections)
+            pool['idle_connections'] = sum(1 for c in connections if c.is_idle())
+        return {
+            'pool': pool,
+            'health': self.health,
+            'breaker': backend.breaker.snapshot(),
+            'requests': backend.metrics.snapshot(),
+        }
+
+
+client = BackendClient()
+
+
+async def proxy(request, path):
+    """Async version of backend.proxy() using the shared pool."""
+    data, files = backend.forwarded_body(request)
+    try:
+        resp = await client.request(request.method, path, backend.forwarded_headers(request),
+                                    params=list(request.GET.items()), data=data, files=files)
+    except backend.BackendUnavailable:
+        return backend.unavailable_response()
+    return backend.relay(resp)
+
+
+async def lifespan(scope, receive, send):
+    """ASGI lifespan protocol: start the pool on startup, close it on shutdown."""
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            try:
+                await client.start()
+            except Exception as exc:
+                await send({'type': 'lifespan.startup.failed', 'message': str(exc)})
+                return
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await client.stop()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
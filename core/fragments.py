@@ -0,0 +1,103 @@
+"""
+Translated static regions of a page, for switching language without a reload.
+
+Elements marked with ``data-i18n-region="<name>"`` in the templates are
+rendered in the requested language and returned as
+``{name: {'html': <inner html>, 'attrs': {<translated attributes>}}}``.
+Regions must not depend on the request or the user, because the result is
+cached per (page, language).
+"""
+from html.parser import HTMLParser
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import translation
+
+# url name -> template; the pages that can switch language in place
+PAGE_TEMPLATES = {
+    'landing': 'core/landing.html',
+    'how_it_works': 'core/how_it_works.html',
+    'pricing': 'core/pricing.html',
+    'chat': 'core/chat.html',
+    'positions': 'core/positions.html',
+    'favorites': 'core/favorites.html',
+}
+
+REGION_ATTR = 'data-i18n-region'
+
+# Attributes that carry translated text
+TRANSLATED_ATTRS = ('placeholder', 'title', 'aria-label', 'data-reset-label')
+
+VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+
+def translated_attrs(attrs):
+    return {name: attrs[name] for name in TRANSLATED_ATTRS if attrs.get(name) is not None}
+
+
+class RegionParser(HTMLParser):
+    def __init__(self, source):
+        super().__init__(convert_charrefs=False)
+        self.source = source
+        self.regions = {}
+        self._open = []  # regions whose end tag has not been seen yet
+        self._line_starts = [0]
+        for index, char in enumerate(source):
+            if char == '\n':
+                self._line_starts.append(index + 1)
+
+    def _offset(self):
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        for region in self._open:
+            if region['tag'] == tag:
+                region['depth'] += 1
+
+        attrs = dict(attrs)
+        name = attrs.get(REGION_ATTR)
+        if not name:
+            return
+        self.regions[name] = {'attrs': translated_attrs(attrs)}
+        if tag not in VOID_ELEMENTS:
+            start = self._offset() + len(self.get_starttag_text())
+            self._open.append({'name': name, 'tag': tag, 'depth': 0, 'start': start})
+
+    def handle_startendtag(self, tag, attrs):
+        # <tag ... /> has no content, only attributes
+        attrs = dict(attrs)
+        name = attrs.get(REGION_ATTR)
+        if name:
+            self.regions[name] = {'attrs': translated_attrs(attrs)}
+
+    def handle_endtag(self, tag):
+        end = self._offset()
+        for region in list(self._open):
+            if region['tag'] != tag:
+                continue
+            if region['depth'] == 0:
+                self.regions[region['name']]['html'] = self.source[region['start']:end].strip()
+                self._open.remove(region)
+            else:
+                region['depth'] -= 1
+
+
+def extract_regions(html):
+    parser = RegionParser(html)
+    parser.feed(html)
+    parser.close()
+    return parser.regions
+
+
+def get_fragments(request, page, language):
+    """Translated regions of a page, cached per (page, language)."""
+    key = f'i18n-fragments:{page}:{language}'
+    regions = cache.get(key)
+    if regions is None:
+        with translation.override(language):
+            html = render_to_string(PAGE_TEMPLATES[page], {}, request=request)
+        regions = extract_regions(html)
+        cache.set(key, regions, settings.I18N_FRAGMENT_CACHE_TIMEOUT)
+    return regions
@@ -0,0 +1,97 @@
+"""
+Job search gateway: one deduplicated, field-projected, compressed job list.
+
+The backend's /scrape-jobs returns the career field search and the skills
+search as two full job lists that overlap. The positions page only needs
+one list and a handful of fields per card, so the merge and projection
+happen here instead of shipping everything to the browser.
+"""
+import gzip
+import json
+
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Canonical field -> names the backend (or older scrapers) may use for it
+JOB_FIELD_ALIASES = {
+    'urn': ('urn', 'job_urn'),
+    'title': ('title', 'job_title'),
+    'company': ('company', 'company_name'),
+    'location': ('location', 'job_location'),
+    'description': ('description', 'job_description'),
+    'apply_link': ('apply_link', 'applyLink', 'url', 'link', 'job_url'),
+    'image': ('image',),
+}
+
+# What the job cards in positions.js render
+DEFAULT_JOB_FIELDS = ('urn', 'title', 'company', 'location', 'description', 'apply_link')
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+
+def parse_fields(value):
+    """Parse ``fields=title,company`` into known fields; defaults to the card fields."""
+    if not value:
+        return DEFAULT_JOB_FIELDS
+    fields = tuple(f for f in (part.strip() for part in value.split(',')) if f in JOB_FIELD_ALIASES)
+    if 'urn' not in fields:
+        fields = ('urn',) + fields  # needed to dedupe and for favorites
+    return fields
+
+
+def project_job(job, fields):
+    projected = {}
+    for field in fields:
+        for name in JOB_FIELD_ALIASES[field]:
+            value = job.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value:
+                projected[field] = value
+                break
+    return projected
+
+
+def merge_jobs(data, fields):
+    """Merge both searches of a /scrape-jobs response, deduplicated by URN."""
+    jobs = []
+    seen = set()
+    for search in ('career_field_search', 'skills_search'):
+        for job in (data.get(search) or {}).get('jobs') or []:
+            projected = project_job(job, fields)
+            urn = projected.get('urn')
+            if urn:
+                if urn in seen:
+                    continue
+                seen.add(urn)
+            jobs.append(projected)
+    return jobs
+
+
+def compressed_json_response(request, payload, status=200):
+    """JSON response compressed with brotli or gzip, whichever the client accepts."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    accepted = {
+        part.split(';')[0].strip().lower()
+        for part in request.headers.get('Accept-Encoding', '').split(',')
+    }
+
+    encoding = None
+    if len(body) >= MIN_COMPRESS_SIZE:
+        if HAS_BROTLI and 'br' in accepted:
+            body, encoding = brotli.compress(body, quality=5), 'br'
+        elif 'gzip' in accepted:
+            body, encoding = gzip.compress(body, compresslevel=6), 'gzip'
+
+    response = HttpResponse(body, status=status, content_type='application/json')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
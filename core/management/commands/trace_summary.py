@@ -0,0 +1,133 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import tracing
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def fmt_ms(value):
+    return '-' if value is None else f'{value:.0f}ms'
+
+
+def _counted(span, by_id):
+    """Spans that add to a hop's time.
+
+    Browser actions and Django requests count by their top-level span only
+    (kind ``client`` / ``server``); a backend call counts only if it was made
+    while handling a request, not from an internal span such as a prefetch
+    that keeps running after the response was sent.
+    """
+    hop = span.get('hop')
+    if hop == 'browser':
+        return True
+    if hop == 'django':
+        return span.get('kind') == 'server'
+    if hop == 'backend':
+        parent = by_id.get(span.get('parent_span_id'))
+        while parent is not None and parent.get('hop') != 'django':
+            parent = by_id.get(parent.get('parent_span_id'))
+        return parent is None or parent.get('kind') == 'server'
+    return False
+
+
+def breakdown(spans):
+    """Split a trace into time spent only in each hop.
+
+    Django time excludes the backend calls it made, browser time excludes the
+    Django requests it waited for (what is left is network + client work).
+    """
+    by_id = {span.get('span_id'): span for span in spans}
+    total = {hop: 0.0 for hop in tracing.HOPS}
+    seen = {hop: False for hop in tracing.HOPS}
+    for span in spans:
+        hop = span.get('hop')
+        if hop in total and span.get('duration_ms') is not None and _counted(span, by_id):
+            total[hop] += span['duration_ms']
+            seen[hop] = True
+
+    result = {
+        'backend': total['backend'] if seen['backend'] else None,
+        'django': max(0.0, total['django'] - total['backend']) if seen['django'] else None,
+        'browser': max(0.0, total['browser'] - total['django']) if seen['browser'] else None,
+    }
+    result['total'] = max(total['browser'], total['django'], total['backend'])
+    return result
+
+
+def root_name(spans):
+    for hop in tracing.HOPS:
+        for span in spans:
+            if span.get('hop') == hop:
+                return span.get('name', '?')
+    return '?'
+
+
+class Command(BaseCommand):
+    help = 'Summarize exported trace spans with a latency breakdown per hop (browser, Django, backend).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--trace', help='Show every span of a single trace id.')
+        parser.add_argument('--recent', type=int, default=10, help='Number of most recent traces to list.')
+
+    def handle(self, *args, **options):
+        traces = defaultdict(list)
+        for span in tracing.read_spans():
+            traces[span.get('trace_id')].append(span)
+
+        if not traces:
+            self.stdout.write(f'No spans found in {settings.TRACE_EXPORT_PATH}')
+            return
+
+        if options['trace']:
+            self.show_trace(options['trace'], traces.get(options['trace'], []))
+            return
+
+        # Aggregate per user action
+        by_action = defaultdict(lambda: defaultdict(list))
+        for spans in traces.values():
+            parts = breakdown(spans)
+            action = root_name(spans)
+            for key, value in parts.items():
+                if value is not None:
+                    by_action[action][key].append(value)
+
+        columns = ('total', 'browser', 'django', 'backend')
+        self.stdout.write(f"{'action':40} {'count':>6} " + ' '.join(f'{c + " p50/p95":>20}' for c in columns))
+        for action, parts in sorted(by_action.items(), key=lambda item: -len(item[1]['total'])):
+            cells = [
+                f"{fmt_ms(percentile(parts[c], 50))}/{fmt_ms(percentile(parts[c], 95))}"
+                for c in columns
+            ]
+            self.stdout.write(f"{action[:40]:40} {len(parts['total']):>6} " + ' '.join(f'{c:>20}' for c in cells))
+
+        self.stdout.write('')
+        self.stdout.write('Most recent traces:')
+        recent = sorted(traces.items(), key=lambda item: min(s.get('start', 0) for s in item[1]))
+        for trace_id, spans in recent[-options['recent']:]:
+            parts = breakdown(spans)
+            self.stdout.write(
+                f"  {trace_id}  {root_name(spans)[:40]:40} total={fmt_ms(parts['total'])} "
+                f"browser={fmt_ms(parts['browser'])} django={fmt_ms(parts['django'])} "
+                f"backend={fmt_ms(parts['backend'])}"
+            )
+
+    def show_trace(self, trace_id, spans):
+        if not spans:
+            self.stderr.write(f'Trace {trace_id} not found')
+            return
+        start = min(s.get('start', 0) for s in spans)
+        for span in sorted(spans, key=lambda s: s.get('start', 0)):
+            offset = (span.get('start', 0) - start) * 1000
+            self.stdout.write(
+                f"  +{offset:8.1f}ms {fmt_ms(span.get('duration_ms')):>9} "
+                f"{span.get('hop', '?'):8} {span.get('status', ''):5} {span.get('name', '')}"
+            )
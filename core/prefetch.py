@@ -0,0 +1,167 @@
+"""
+Speculative job search right after a successful CV upload.
+
+Users almost always go from the CV analysis in the chat straight to the
+positions page, which then waits 30-60 s for /scrape-jobs. After the
+backend has saved the analysis to the user's profile we start that search
+in the background for the user's last-used city, so /api/jobs/ can attach
+to the running or finished search instead of starting a new one.
+
+Policy:
+- low priority: a prefetch only starts while the scraper is idle and has
+  nobody queued; if that does not happen within PREFETCH_START_TIMEOUT
+  it is dropped,
+- bounded: at most PREFETCH_MAX_WORKERS prefetches run at once, one per user,
+- cancelled when the user uploads again, searches a different city, or
+  asks for jobs before the prefetch has started; a scrape that is already
+  running keeps its scraper slot until the backend returns, because the
+  backend keeps scraping even if we stop waiting and the scraper must not
+  run two searches at once,
+- results are used once and expire after PREFETCH_TTL seconds; expired
+  entries are dropped whenever a new prefetch starts.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import backend, tracing
+from .admission import get_controller, user_key
+
+logger = logging.getLogger(__name__)
+
+WAITING = 'waiting'
+RUNNING = 'running'
+DONE = 'done'
+CANCELLED = 'cancelled'
+
+# How often a waiting prefetch checks whether the scraper became idle
+IDLE_POLL_INTERVAL = 1.0
+
+_executor = None
+_entries = {}  # user -> Prefetch
+_lock = threading.Lock()
+
+
+class Prefetch:
+    def __init__(self, city, max_pages):
+        self.city = city
+        self.max_pages = max_pages
+        self.state = WAITING
+        self.created = time.monotonic()
+        self.future = None
+
+    def matches(self, city, max_pages):
+        return self.city.lower() == city.lower() and str(self.max_pages) == str(max_pages)
+
+    def expired(self):
+        return time.monotonic() - self.created > settings.PREFETCH_TTL
+
+    def cancel(self):
+        if self.state in (WAITING, RUNNING):
+            self.state = CANCELLED
+        if self.future is not None:
+            self.future.cancel()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PREFETCH_MAX_WORKERS,
+            thread_name_prefix='job-prefetch',
+        )
+    return _executor
+
+
+def job_city(request):
+    """The city the user searched last, or the default city of the positions page."""
+    return request.COOKIES.get(settings.JOB_CITY_COOKIE) or settings.PREFETCH_DEFAULT_CITY
+
+
+def after_cv_upload(request, response):
+    """Start a prefetch if /extract-text saved the analysis to the user's profile."""
+    if not settings.PREFETCH_ENABLED or 'Authorization' not in request.headers:
+        return
+    try:
+        data = json.loads(response.content)
+    except ValueError:
+        return
+    if not data.get('saved_to_db'):
+        return
+    start(user_key(request), {'Authorization': request.headers['Authorization']}, job_city(request))
+
+
+def start(user, headers, city, max_pages=1):
+    with _lock:
+        for other, old in list(_entries.items()):
+            if old.expired():
+                old.cancel()
+                del _entries[other]
+        previous = _entries.get(user)
+        if previous is not None:
+            previous.cancel()  # superseded by the newer upload
+        entry = Prefetch(city, max_pages)
+        _entries[user] = entry
+        # Run in a copy of the current context so the search shows up in the upload's trace
+        context = contextvars.copy_context()
+        entry.future = _get_executor().submit(context.run, _run, entry, headers)
+    logger.info('Prefetching jobs in %s', city)
+
+
+def _run(entry, headers):
+    controller = get_controller('scraper')
+    deadline = time.monotonic() + settings.PREFETCH_START_TIMEOUT
+    while not controller.try_admit_idle():
+        if entry.state == CANCELLED or time.monotonic() > deadline:
+            entry.state = CANCELLED
+            return None
+        time.sleep(IDLE_POLL_INTERVAL)
+
+    started = None
+    try:
+        if entry.state == CANCELLED:
+            return None
+        entry.state = RUNNING
+        started = time.monotonic()
+        with tracing.start_span('prefetch scrape-jobs', hop='django', attributes={'city': entry.city}):
+            resp = backend.call('GET', 'scrape-jobs', headers,
+                                params={'city': entry.city, 'max_pages': entry.max_pages})
+        if entry.state == CANCELLED:
+            return None
+        entry.state = DONE
+        return resp.status_code, resp.json()
+    except (backend.BackendUnavailable, ValueError) as exc:
+        logger.warning('Job prefetch failed: %s', exc)
+        entry.state = CANCELLED
+        return None
+    finally:
+        controller.release(time.monotonic() - started if started else None)
+
+
+async def claim(user, city, max_pages):
+    """Return ``(status, data)`` of a matching prefetch, waiting for it if it is running.
+
+    Returns None if there is nothing to attach to; the caller then searches itself.
+    """
+    with _lock:
+        entry = _entries.pop(user, None)
+    if entry is None:
+        return None
+    if entry.expired() or not entry.matches(city, max_pages) or entry.state == WAITING:
+        # Not what the user wants, or not started yet: free the scraper for the real request
+        entry.cancel()
+        return None
+    future = asyncio.wrap_future(entry.future)
+    done, _pending = await asyncio.wait({future}, timeout=settings.BACKEND_TIMEOUT)
+    if not done:
+        entry.cancel()
+        return None
+    if future.cancelled():
+        return None
+    return future.result()
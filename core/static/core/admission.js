@@ -0,0 +1,67 @@
+// Admission-controlled calls to the Django tier (/api/...)
+// Django queues slow backend calls (LLM, scraper) fairly per user. When a
+// request has to wait it answers 202 with a ticket, queue position and ETA;
+// we poll the ticket and re-send the request once it is our turn.
+const ADMISSION_POLL_INTERVAL_MS = 2000;
+
+const CVAdmission = (function () {
+  function getCookie(name) {
+    const match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+    return match ? decodeURIComponent(match[1]) : null;
+  }
+
+  function sleep(ms) {
+    return new Promise(resolve => setTimeout(resolve, ms));
+  }
+
+  // Poll until the ticket is granted; returns the ticket, or null if it expired
+  async function waitForTurn(queued, headers, onQueued) {
+    const pollUrl = queued.poll_url;
+    let status = queued;
+    while (status.status === 'queued') {
+      if (onQueued) onQueued(status);
+      await sleep(ADMISSION_POLL_INTERVAL_MS);
+      const response = await fetch(pollUrl, { headers: headers });
+      status = await response.json();
+    }
+    return status.status === 'ready' ? status.ticket : null;
+  }
+
+  // Same as fetch(), but waits in the queue when the backend is busy.
+  // onQueued({ position, eta_seconds }) is called on every queue update.
+  async function admittedFetch(url, options, onQueued) {
+    const headers = Object.assign({}, (options && options.headers) || {});
+    const csrfToken = getCookie('csrftoken');
+    if (csrfToken) {
+      headers['X-CSRFToken'] = csrfToken;
+    }
+    const pollHeaders = {};
+    if (headers['Authorization']) {
+      pollHeaders['Authorization'] = headers['Authorization'];
+    }
+
+    let ticket = null;
+    while (true) {
+      if (ticket) {
+        headers['X-Admission-Ticket'] = ticket;
+      } else {
+        delete headers['X-Admission-Ticket'];
+      }
+
+      const response = await fetch(url, Object.assign({}, options, { headers: headers }));
+      if (response.status !== 202) {
+        return response;
+      }
+      ticket = await waitForTurn(await response.json(), pollHeaders, onQueued);
+    }
+  }
+
+  // Human readable queue status, e.g. "You are #3 in line (about 1 min)."
+  function describe(queued) {
+    const eta = queued.eta_seconds || 0;
+    const etaText = eta >= 60 ? `about ${Math.round(eta / 60)} min` : `about ${eta} s`;
+    return `You are #${queued.position} in line (${etaText}).`;
+  }
+
+  return { fetch: admittedFetch, describe: describe };
+})();
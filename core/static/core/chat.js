@@ -1,6 +1,8 @@
 // Chat functionality with PDF upload and text extraction
 // Use API_BASE_URL from login.js if available, otherwise use default
 const CHAT_API_BASE_URL = (typeof API_BASE_URL !== 'undefined') ? API_BASE_URL : 'http://localhost:8000';
+// LLM calls go through the Django tier, which queues them fairly per user
+const CHAT_PROXY_BASE_URL = '/api';
 
 document.addEventListener('DOMContentLoaded', function () {
   console.log('Chat.js loaded and initialized');
@@ -139,6 +141,8 @@ document.addEventListener('DOMContentLoaded', function () {
   });
 
   // Handle file processing
+  let uploading = false;
+
   async function handleFile(file) {
     // Validate file type
     if (file.type !== 'application/pdf' && !file.name.toLowerCase().endsWith('.pdf')) {
@@ -147,6 +151,7 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // Show loading state
+    uploading = true;
     uploadBtn.disabled = true;
     uploadBtn.textContent = '⏳';
     chatInput.disabled = true;
@@ -158,6 +163,7 @@ document.addEventListener('DOMContentLoaded', function () {
       console.error('PDF upload error:', error);
       showError(error.message || 'Failed to analyze PDF. Please try again.');
     } finally {
+      uploading = false;
       uploadBtn.disabled = false;
       uploadBtn.textContent = '+';
       chatInput.disabled = false;
@@ -189,9 +195,10 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Get access token if user is authenticated
     const accessToken = localStorage.getItem('access_token');
+    const trace = CVTrace.startAction('upload-cv', { size: file.size });
     
     // Prepare headers
-    const headers = {};
+    const headers = trace.headers();
     if (accessToken) {
       headers['Authorization'] = `Bearer ${accessToken}`;
     }
@@ -203,12 +210,12 @@ document.addEventListener('DOMContentLoaded', function () {
     const loadingMessageId = addAIMessageWithId('⏳ Analyzing your CV and identifying potential career fields... This may take 30-60 seconds.');
 
     try {
-      const response = await fetch(`${CHAT_API_BASE_URL}/extract-text`, {
+      const response = await CVAdmission.fetch(`${CHAT_PROXY_BASE_URL}/extract-text/`, {
         method: 'POST',
         headers: headers,
         body: formData,
         // Don't set Content-Type header - browser sets it automatically with boundary
-      });
+      }, (queued) => updateAIMessage(loadingMessageId, `⏳ ${CVAdmission.describe(queued)}`));
 
       const data = await response.json();
 
@@ -240,9 +247,11 @@ document.addEventListener('DOMContentLoaded', function () {
 
       // Display career analysis results
       displayCareerAnalysis(data);
+      trace.end('ok', { status: response.status });
 
     } catch (error) {
       console.error('PDF analysis error:', error);
+      trace.end('error');
       throw error;
     }
   }
@@ -340,6 +349,17 @@ document.addEventListener('DOMContentLoaded', function () {
     return messageId;
   }
 
+  // Replace the text of an AI message (e.g. a loading message) by ID
+  function updateAIMessage(messageId, text) {
+    const message = document.getElementById(messageId);
+    const bubble = message ? message.querySelector('.cv-chat-bubble-ai') : null;
+    if (!bubble) return;
+    bubble.innerHTML = '';
+    const p = document.createElement('p');
+    p.textContent = text;
+    bubble.appendChild(p);
+  }
+
   // Remove message by ID
   function removeMessage(messageId) {
     const message = document.getElementById(messageId);
@@ -377,6 +397,8 @@ document.addEventListener('DOMContentLoaded', function () {
     // Show loading indicator
     const loadingMessageId = addAIMessageWithId('⏳ Thinking...');
     console.log('Loading message ID:', loadingMessageId);
+    const trace = CVTrace.startAction('career-chat');
+    let traceStatus = 'error';
 
     try {
       // Get access token
@@ -393,7 +415,7 @@ document.addEventListener('DOMContentLoaded', function () {
         return;
       }
 
-      const requestUrl = `${CHAT_API_BASE_URL}/career-chat`;
+      const requestUrl = `${CHAT_PROXY_BASE_URL}/career-chat/`;
       const requestBody = JSON.stringify({ message: message });
       console.log('Calling career-chat endpoint:', requestUrl);
       console.log('Request body:', requestBody);
@@ -403,14 +425,14 @@ document.addEventListener('DOMContentLoaded', function () {
       });
 
       // Call career-chat endpoint
-      const response = await fetch(requestUrl, {
+      const response = await CVAdmission.fetch(requestUrl, {
         method: 'POST',
-        headers: {
+        headers: trace.headers({
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${accessToken}`,
-        },
+        }),
         body: requestBody,
-      });
+      }, (queued) => updateAIMessage(loadingMessageId, `⏳ ${CVAdmission.describe(queued)}`));
 
       console.log('Response status:', response.status);
       console.log('Response ok:', response.ok);
@@ -452,6 +474,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
       // Display AI's reply
       addAIMessage(assistantReply);
+      traceStatus = 'ok';
 
     } catch (error) {
       console.error('Error calling career-chat:', error);
@@ -466,6 +489,7 @@ document.addEventListener('DOMContentLoaded', function () {
       
       addAIMessage(`❌ ${errorMessage}`);
     } finally {
+      trace.end(traceStatus);
       // Re-enable input and send button
       chatInput.disabled = false;
       sendBtn.disabled = false;
@@ -542,6 +566,8 @@ document.addEventListener('DOMContentLoaded', function () {
     scrollToBottom();
   }
 
+  let clearingHistory = false;
+
   async function deleteChatHistory() {
     const accessToken = localStorage.getItem('access_token');
     if (!accessToken) {
@@ -550,6 +576,7 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     const btn = document.getElementById('cv-clear-history-btn');
+    clearingHistory = true;
     if (btn) {
       btn.disabled = true;
       btn.textContent = '…';
@@ -578,6 +605,7 @@ document.addEventListener('DOMContentLoaded', function () {
       console.error('Delete chat history error', e);
       addAIMessage('❌ Could not clear history. Please try again.');
     } finally {
+      clearingHistory = false;
       if (btn) {
         btn.disabled = false;
         btn.textContent = btn.dataset.resetLabel || 'Clear history';
@@ -590,6 +618,16 @@ document.addEventListener('DOMContentLoaded', function () {
     clearHistoryBtn.addEventListener('click', deleteChatHistory);
   }
 
+  // i18n.js swapped in the template texts of the new language; show pending work again
+  document.addEventListener('cv:language-changed', () => {
+    if (uploading) {
+      uploadBtn.textContent = '⏳';
+    }
+    if (clearingHistory && clearHistoryBtn) {
+      clearHistoryBtn.textContent = '…';
+    }
+  });
+
   async function fetchChatHistory() {
     const accessToken = localStorage.getItem('access_token');
     if (!accessToken) return;
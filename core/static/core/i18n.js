@@ -0,0 +1,58 @@
+// Language switching without a full page reload
+// Fetches the translated static regions of the current page (cached by Django
+// per page and language) and swaps them in place, so in-memory state such as
+// loaded jobs and chat rows survives. Falls back to the set_language form.
+const I18N_FRAGMENTS_URL = '/i18n/fragments/';
+const LANGUAGE_COOKIE_NAME = 'django_language';
+
+document.addEventListener('DOMContentLoaded', function () {
+  const select = document.querySelector('.cv-lang-select');
+  const page = document.body.dataset.page;
+  if (!select) return;
+
+  // page:language -> regions, so switching back is free
+  const fragmentCache = {};
+
+  async function loadRegions(language) {
+    const key = `${page}:${language}`;
+    if (!fragmentCache[key]) {
+      const url = `${I18N_FRAGMENTS_URL}?page=${encodeURIComponent(page)}&language=${encodeURIComponent(language)}`;
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error(`Failed to load translations (HTTP ${response.status})`);
+      }
+      fragmentCache[key] = (await response.json()).regions;
+    }
+    return fragmentCache[key];
+  }
+
+  function applyRegions(regions) {
+    document.querySelectorAll('[data-i18n-region]').forEach(el => {
+      const region = regions[el.dataset.i18nRegion];
+      if (!region) return;
+      if (region.html !== undefined) {
+        el.innerHTML = region.html;
+      }
+      Object.entries(region.attrs || {}).forEach(([name, value]) => el.setAttribute(name, value));
+    });
+    // Strings used by the scripts (login.js) live in a JSON region
+    const strings = document.getElementById('cv-i18n-strings');
+    if (strings) {
+      window.I18N = JSON.parse(strings.textContent);
+    }
+  }
+
+  select.addEventListener('change', async () => {
+    const language = select.value;
+    try {
+      if (!page) throw new Error('Page does not support in-place language switching');
+      applyRegions(await loadRegions(language));
+      document.documentElement.lang = language;
+      document.cookie = `${LANGUAGE_COOKIE_NAME}=${language}; path=/; max-age=31536000; samesite=lax`;
+      document.dispatchEvent(new CustomEvent('cv:language-changed', { detail: { language: language } }));
+    } catch (e) {
+      console.warn('Switching language with a page reload', e);
+      select.form.submit();
+    }
+  });
+});
@@ -352,6 +352,12 @@ document.addEventListener('DOMContentLoaded', function () {
   // Check auth status on page load
   checkAuthStatus();
 
+  // Re-apply translated texts after an in-place language switch (i18n.js)
+  document.addEventListener('cv:language-changed', () => {
+    updateUI();
+    updateAuthUI(!!currentUser, currentUser);
+  });
+
   // Export functions for use in other scripts
   window.authAPI = {
     refreshAccessToken,
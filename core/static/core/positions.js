@@ -1,10 +1,16 @@
 // API Configuration - use API_BASE_URL from login.js if available
 const JOBS_API_BASE_URL = (typeof API_BASE_URL !== 'undefined') ? API_BASE_URL : 'http://localhost:8000';
+// Job searches go through the Django tier, which queues scraper calls fairly per user
+const JOBS_PROXY_BASE_URL = '/api';
 
 document.addEventListener('DOMContentLoaded', function () {
   // --- DOM elements ---
   const jobList = document.getElementById('jobList');
   const loadingState = document.getElementById('loadingState');
+  const loadingText = loadingState.querySelector('p');
+  let defaultLoadingText = loadingText ? loadingText.textContent : '';
+  let queueMessage = null; // queue position shown instead of the loading text
+  let emptyMessage = null; // set once a search replaced the template's hint
   const errorState = document.getElementById('errorState');
   const errorMessage = document.getElementById('errorMessage');
   const emptyState = document.getElementById('emptyState');
@@ -18,7 +24,8 @@ document.addEventListener('DOMContentLoaded', function () {
   let allJobs = []; // All jobs from API
   let jobCards = []; // DOM elements
   let favorites = loadFavorites();
-  let currentCity = 'Heilbronn'; // Default city
+  // Last searched city (rendered by Django), matches the search prefetched after a CV upload
+  let currentCity = cityInput.value.trim() || 'Heilbronn';
 
   const FAV_KEY = 'cv_favorites';
   const FAV_JOBS_KEY = 'cv_favorite_jobs';
@@ -74,18 +81,25 @@ document.addEventListener('DOMContentLoaded', function () {
     showLoading();
     hideError();
     hideEmptyState();
+    const trace = CVTrace.startAction('scrape-jobs', { city: city, max_pages: maxPages });
 
     try {
       const accessToken = localStorage.getItem('access_token');
-      const headers = {};
+      const headers = trace.headers();
       if (accessToken) {
         headers['Authorization'] = `Bearer ${accessToken}`;
       }
 
-      const url = `${JOBS_API_BASE_URL}/scrape-jobs?city=${encodeURIComponent(city)}&max_pages=${maxPages}`;
-      const response = await fetch(url, {
+      // Gateway returns one list, deduplicated by URN, with only the card fields
+      const url = `${JOBS_PROXY_BASE_URL}/jobs/?city=${encodeURIComponent(city)}&max_pages=${maxPages}`;
+      const response = await CVAdmission.fetch(url, {
         method: 'GET',
         headers: headers,
+      }, (queued) => {
+        queueMessage = CVAdmission.describe(queued);
+        if (loadingText) {
+          loadingText.textContent = queueMessage;
+        }
       });
 
       const data = await response.json();
@@ -98,22 +112,7 @@ document.addEventListener('DOMContentLoaded', function () {
         throw new Error(data.detail || 'Failed to fetch jobs');
       }
 
-      // Combine jobs from both career_field_search and skills_search
-      const jobs = [];
-      
-      if (data.career_field_search && data.career_field_search.jobs) {
-        jobs.push(...data.career_field_search.jobs);
-      }
-      
-      if (data.skills_search && data.skills_search.jobs) {
-        // Avoid duplicates by checking URN
-        const existingUrns = new Set(jobs.map(j => j.urn));
-        data.skills_search.jobs.forEach(job => {
-          if (!existingUrns.has(job.urn)) {
-            jobs.push(job);
-          }
-        });
-      }
+      const jobs = data.jobs || [];
 
       // Debug: Log job data structure
       if (jobs.length > 0) {
@@ -131,9 +130,11 @@ document.addEventListener('DOMContentLoaded', function () {
       if (jobs.length === 0) {
         showEmptyState('No jobs found for this city. Try a different city or upload your CV first.');
       }
+      trace.end('ok', { jobs: jobs.length });
 
     } catch (error) {
       console.error('Error fetching jobs:', error);
+      trace.end('error');
       hideLoading();
       showError(error.message || 'Failed to load jobs. Make sure you have uploaded your CV and have career fields in your profile.');
     }
@@ -344,6 +345,10 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   function showLoading() {
+    queueMessage = null;
+    if (loadingText) {
+      loadingText.textContent = defaultLoadingText;
+    }
     loadingState.style.display = 'block';
     jobList.style.display = 'none';
     errorState.style.display = 'none';
@@ -367,8 +372,9 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   function showEmptyState(message) {
+    emptyMessage = message || 'No jobs found.';
     if (emptyState) {
-      emptyState.textContent = message || 'No jobs found.';
+      emptyState.textContent = emptyMessage;
       emptyState.style.display = 'block';
     }
   }
@@ -380,6 +386,20 @@ document.addEventListener('DOMContentLoaded', function () {
   }
 
   // --- Event Listeners ---
+  // i18n.js swapped in the template texts of the new language; keep them as
+  // defaults and re-render whatever this script is currently showing instead
+  document.addEventListener('cv:language-changed', () => {
+    if (loadingText) {
+      defaultLoadingText = loadingText.textContent;
+      if (queueMessage) {
+        loadingText.textContent = queueMessage;
+      }
+    }
+    if (emptyState && emptyMessage !== null) {
+      emptyState.textContent = emptyMessage;
+    }
+  });
+
   searchJobsBtn.addEventListener('click', () => {
     const city = cityInput.value.trim();
     if (!city) {
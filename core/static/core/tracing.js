@@ -0,0 +1,60 @@
+// Trace context for user actions (W3C traceparent header)
+// Every user action (send chat message, upload CV, search jobs) starts a trace.
+// The traceparent header is sent with the action's requests, and the browser
+// span is reported to Django when the action finishes.
+const TRACE_SPANS_URL = '/trace/spans/';
+
+const CVTrace = (function () {
+  function randomHex(bytes) {
+    const values = new Uint8Array(bytes);
+    crypto.getRandomValues(values);
+    return Array.from(values, b => b.toString(16).padStart(2, '0')).join('');
+  }
+
+  function report(span) {
+    const body = JSON.stringify([span]);
+    try {
+      if (navigator.sendBeacon && navigator.sendBeacon(TRACE_SPANS_URL, body)) {
+        return;
+      }
+      fetch(TRACE_SPANS_URL, { method: 'POST', body: body, keepalive: true }).catch(() => {});
+    } catch (e) {
+      console.warn('Failed to report trace span', e);
+    }
+  }
+
+  // Start a trace for one user action; call end() once the action is done
+  function startAction(name, attributes) {
+    const traceId = randomHex(16);
+    const spanId = randomHex(8);
+    const startedAt = Date.now();
+    const startPerf = performance.now();
+    let ended = false;
+
+    return {
+      traceId: traceId,
+      traceparent: `00-${traceId}-${spanId}-01`,
+
+      // Merge the traceparent header into a fetch headers object
+      headers(extra) {
+        return Object.assign({}, extra || {}, { traceparent: this.traceparent });
+      },
+
+      end(status, extraAttributes) {
+        if (ended) return;
+        ended = true;
+        report({
+          trace_id: traceId,
+          span_id: spanId,
+          name: name,
+          start: startedAt,
+          duration_ms: Math.round((performance.now() - startPerf) * 1000) / 1000,
+          status: status === 'error' ? 'error' : 'ok',
+          attributes: Object.assign({ page: window.location.pathname }, attributes || {}, extraAttributes || {}),
+        });
+      },
+    };
+  }
+
+  return { startAction: startAction };
+})();
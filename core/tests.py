@@ -1,3 +1,596 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import json
+import sys
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+import requests
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, RequestFactory, SimpleTestCase, override_settings
+
+from core import admission, backend, backend_client, fragments, gateway, prefetch
+from core.admission import AdmissionController, Decision, decision_response
+from core.management.commands.trace_summary import breakdown
+
+sys.path.insert(0, str(settings.BASE_DIR / 'translationFunctions'))
+import extract_messages  # noqa: E402
+
+
+# Test requests must not end up in the developer's traces/spans.jsonl
+no_tracing = override_settings(TRACE_ENABLED=False)
+
+
+def span(span_id, hop, kind, duration_ms, parent=None, name='span'):
+    return {'trace_id': 'a' * 32, 'span_id': span_id, 'parent_span_id': parent, 'name': name,
+            'hop': hop, 'kind': kind, 'start': 0, 'duration_ms': duration_ms, 'status': 'ok',
+            'attributes': {}}
+
+
+class TraceBreakdownTests(SimpleTestCase):
+    def test_splits_time_per_hop(self):
+        parts = breakdown([
+            span('1', 'browser', 'client', 1000),
+            span('2', 'django', 'server', 800, parent='1'),
+            span('3', 'backend', 'client', 500, parent='2'),
+        ])
+        self.assertEqual(parts, {'browser': 200, 'django': 300, 'backend': 500, 'total': 1000})
+
+    def test_ignores_internal_and_background_spans(self):
+        parts = breakdown([
+            span('1', 'browser', 'client', 1000),
+            span('2', 'django', 'server', 800, parent='1'),
+            span('3', 'backend', 'client', 500, parent='2'),
+            # Prefetch started by the request, running after the response was sent
+            span('4', 'django', 'internal', 40000, parent='2', name='prefetch scrape-jobs'),
+            span('5', 'backend', 'client', 39000, parent='4'),
+        ])
+        self.assertEqual(parts, {'browser': 200, 'django': 300, 'backend': 500, 'total': 1000})
+
+
+@no_tracing
+class TraceSpansViewTests(SimpleTestCase):
+    def test_caps_client_attributes(self):
+        payload = {
+            'trace_id': 'a' * 32, 'span_id': 'b' * 16, 'name': 'x' * 500,
+            'start': 0, 'duration_ms': 5,
+            'attributes': {f'key{i}': 'v' * 1000 for i in range(100)},
+        }
+        with mock.patch('core.tracing.export_span') as export:
+            response = self.client.post('/trace/spans/', json.dumps(payload), content_type='application/json')
+        self.assertEqual(response.status_code, 204)
+        exported = export.call_args.args[0]
+        self.assertEqual(len(exported['name']), 100)
+        self.assertEqual(len(exported['attributes']), 20)
+        self.assertTrue(all(len(value) == 200 for value in exported['attributes'].values()))
+
+
+def backend_response(data, status=200):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.headers['Content-Type'] = 'application/json'
+    resp._content = json.dumps(data).encode()
+    return resp
+
+
+def controller(**options):
+    defaults = {'max_concurrency': 1, 'queue_limit': 10, 'per_user_queue_limit': 3,
+                'rate': 100, 'burst': 100, 'expected_duration': 30}
+    return AdmissionController('test', **{**defaults, **options})
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def test_admits_while_slots_are_free(self):
+        ctrl = controller(max_concurrency=2)
+        self.assertEqual(ctrl.admit('a').state, admission.ADMITTED)
+        self.assertEqual(ctrl.admit('b').state, admission.ADMITTED)
+        self.assertEqual(ctrl.admit('c').state, admission.QUEUED)
+
+    def test_round_robin_across_users(self):
+        ctrl = controller()
+        ctrl.admit('running')
+        a1, a2 = ctrl.admit('a'), ctrl.admit('a')
+        b1 = ctrl.admit('b')
+        c1 = ctrl.admit('c')
+        # a's second request waits for b and c instead of running right after a's first
+        positions = [ctrl.status(user, d.ticket).position for user, d in (('a', a1), ('b', b1), ('c', c1), ('a', a2))]
+        self.assertEqual(positions, [1, 2, 3, 4])
+
+        order = []
+        for _ in range(4):
+            ctrl.release(30)
+            (ticket,) = ctrl.granted.values()
+            order.append(ticket.id)
+            self.assertEqual(ctrl.admit(ticket.user, ticket.id).state, admission.ADMITTED)
+        self.assertEqual(order, [a1.ticket, b1.ticket, c1.ticket, a2.ticket])
+
+    def test_eta_from_position_and_average_duration(self):
+        ctrl = controller(max_concurrency=2, expected_duration=30)
+        ctrl.admit('x')
+        ctrl.admit('y')
+        ctrl.admit('a')
+        ctrl.admit('b')
+        decision = ctrl.admit('c')
+        self.assertEqual(decision.position, 3)
+        self.assertEqual(decision.eta, 60)  # two rounds of two slots
+
+    def test_status_of_granted_ticket(self):
+        ctrl = controller()
+        ctrl.admit('x')
+        queued = ctrl.admit('a')
+        self.assertEqual(ctrl.status('a', queued.ticket).state, admission.QUEUED)
+        ctrl.release()
+        self.assertEqual(ctrl.status('a', queued.ticket).state, admission.GRANTED)
+        # Tickets are bound to their user
+        self.assertEqual(ctrl.status('b', queued.ticket).state, admission.EXPIRED)
+
+    @override_settings(ADMISSION_GRANT_TIMEOUT=15)
+    def test_unused_grant_expires_and_passes_the_slot_on(self):
+        ctrl = controller()
+        ctrl.admit('x')
+        a = ctrl.admit('a')
+        b = ctrl.admit('b')
+        ctrl.release()
+        ctrl.granted[a.ticket].granted_at -= 16
+        self.assertEqual(ctrl.status('a', a.ticket).state, admission.EXPIRED)
+        self.assertEqual(ctrl.status('b', b.ticket).state, admission.GRANTED)
+
+    @override_settings(ADMISSION_ABANDON_TIMEOUT=20)
+    def test_abandoned_ticket_leaves_the_queue(self):
+        ctrl = controller()
+        ctrl.admit('x')
+        a = ctrl.admit('a')
+        b = ctrl.admit('b')
+        ctrl.waiting[a.ticket].last_seen -= 21
+        self.assertEqual(ctrl.status('b', b.ticket).position, 1)
+        self.assertNotIn('a', ctrl.queues)
+        self.assertNotIn('a', ctrl.round_robin)
+
+    def test_per_user_queue_limit(self):
+        ctrl = controller(per_user_queue_limit=1)
+        ctrl.admit('x')
+        self.assertEqual(ctrl.admit('a').state, admission.QUEUED)
+        self.assertEqual(ctrl.admit('a').state, admission.THROTTLED)
+        self.assertEqual(ctrl.admit('b').state, admission.QUEUED)
+
+    def test_full_queue_is_rejected(self):
+        ctrl = controller(queue_limit=1)
+        ctrl.admit('x')
+        ctrl.admit('a')
+        self.assertEqual(ctrl.admit('b').state, admission.REJECTED)
+
+    def test_token_bucket(self):
+        ctrl = controller(max_concurrency=10, rate=0.1, burst=2)
+        self.assertEqual(ctrl.admit('a').state, admission.ADMITTED)
+        self.assertEqual(ctrl.admit('a').state, admission.ADMITTED)
+        decision = ctrl.admit('a')
+        self.assertEqual(decision.state, admission.THROTTLED)
+        self.assertGreater(decision.retry_after, 0)
+
+    def test_unknown_ticket_does_not_skip_the_token_bucket(self):
+        ctrl = controller(max_concurrency=10, rate=0.1, burst=1)
+        ctrl.admit('a')
+        self.assertEqual(ctrl.admit('a', 'bogus').state, admission.THROTTLED)
+
+    def test_refilled_buckets_are_dropped(self):
+        ctrl = controller(max_concurrency=10, rate=1, burst=2)
+        ctrl.admit('a')
+        ctrl.admit('b')
+        ctrl.buckets['a'].updated -= 1
+        ctrl.try_admit_idle()
+        self.assertEqual(list(ctrl.buckets), ['b'])
+
+    def test_held_ticket_skips_the_token_bucket(self):
+        ctrl = controller(rate=0.1, burst=2)
+        ctrl.admit('x')
+        queued = ctrl.admit('a')
+        ctrl.admit('a')  # uses up a's tokens
+        ctrl.release()
+        self.assertEqual(ctrl.admit('a', queued.ticket).state, admission.ADMITTED)
+
+    def test_idle_admission_yields_to_waiting_users(self):
+        ctrl = controller(max_concurrency=2)
+        self.assertTrue(ctrl.try_admit_idle())
+        ctrl.admit('a')
+        ctrl.admit('b')
+        ctrl.release()
+        self.assertFalse(ctrl.try_admit_idle())
+
+
+class DecisionResponseTests(SimpleTestCase):
+    def test_queued(self):
+        response = decision_response('llm', Decision(admission.QUEUED, ticket='t', position=2, eta=60))
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.content), {
+            'status': 'queued', 'backend': 'llm', 'ticket': 't', 'position': 2,
+            'eta_seconds': 60, 'poll_url': '/api/queue/llm/t/',
+        })
+
+    def test_throttled(self):
+        response = decision_response('llm', Decision(admission.THROTTLED, retry_after=2.2))
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+
+    def test_overloaded(self):
+        response = decision_response('scraper', Decision(admission.REJECTED, retry_after=40))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '40')
+
+
+@no_tracing
+class BackendProxyTests(SimpleTestCase):
+    def setUp(self):
+        admission._controllers.clear()
+        backend.breaker.record_success()
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.cookies['csrftoken'] = 'a' * 32
+
+    def test_multipart_upload_with_csrf(self):
+        upload = SimpleUploadedFile('cv.pdf', b'%PDF-1.4 cv', content_type='application/pdf')
+        with mock.patch.object(backend._session, 'request',
+                               return_value=backend_response({'saved_to_db': False})) as request:
+            response = self.client.post('/api/extract-text/', {'file': upload, 'language': 'de'},
+                                        HTTP_X_CSRFTOKEN='a' * 32, HTTP_AUTHORIZATION='Bearer t')
+        self.assertEqual(response.status_code, 200)
+        kwargs = request.call_args.kwargs
+        self.assertEqual(kwargs['files'], [('file', ('cv.pdf', b'%PDF-1.4 cv', 'application/pdf'))])
+        self.assertEqual(kwargs['data'], {'language': ['de']})
+        self.assertNotIn('Content-Type', kwargs['headers'])
+        self.assertEqual(kwargs['headers']['Authorization'], 'Bearer t')
+
+    def test_made_up_tokens_share_the_client_quota(self):
+        statuses = []
+        with mock.patch.object(backend._session, 'request', return_value=backend_response({'jobs': []})):
+            for i in range(4):
+                statuses.append(self.client.get('/api/jobs/', {'city': 'Bern'},
+                                                HTTP_AUTHORIZATION=f'Bearer made-up-{i}').status_code)
+        burst = settings.ADMISSION_BACKENDS['scraper']['burst']
+        self.assertEqual(statuses, [200] * burst + [429] * (4 - burst))
+
+    def test_bogus_ticket_is_throttled(self):
+        statuses = []
+        with mock.patch.object(backend._session, 'request', return_value=backend_response({'jobs': []})):
+            for _ in range(4):
+                statuses.append(self.client.get('/api/jobs/', {'city': 'Bern'},
+                                                HTTP_X_ADMISSION_TICKET='bogus').status_code)
+        burst = settings.ADMISSION_BACKENDS['scraper']['burst']
+        self.assertEqual(statuses, [200] * burst + [429] * (4 - burst))
+
+
+class ExtractMessagesTests(SimpleTestCase):
+    def catalog(self, entries):
+        po = extract_messages.polib.POFile()
+        for msgid, msgstr, occurrences in entries:
+            po.append(extract_messages.polib.POEntry(msgid=msgid, msgstr=msgstr, occurrences=occurrences))
+        return po
+
+    def test_parses_template_and_javascript(self):
+        template = '{% load i18n %}\n<p>{% trans "Hello" %}</p>\n{% blocktrans %}Hi {{ name }}{% endblocktrans %}'
+        self.assertEqual(
+            [m[1:] for m in extract_messages.parse_template(template, 'x.html')],
+            [['Hello', None, 2], ['Hi %(name)s', None, 3]],
+        )
+        js = "const a = gettext('Search');\nngettext('%s job', '%s jobs', n);"
+        self.assertEqual(
+            extract_messages.parse_javascript(js, 'x.js'),
+            [[None, 'Search', None, 1], [None, '%s job', '%s jobs', 2]],
+        )
+
+    def test_updates_only_changed_files(self):
+        po = self.catalog([
+            ('Home', 'Start', [('.\\core\\templates\\core\\base.html', '36')]),
+            ('Pricing', 'Preise', [('.\\core\\templates\\core\\pricing.html', '7')]),
+        ])
+        files = {
+            'core/templates/core/base.html': {'messages': [[None, 'Home', None, 40], [None, 'New', None, 41]]},
+            'core/templates/core/pricing.html': {'messages': [[None, 'Pricing', None, 7]]},
+        }
+        modified = extract_messages.update_catalog(po, files, {'core/templates/core/base.html'}, {'New': 'Neu'})
+        self.assertTrue(modified)
+        self.assertEqual(po.find('Home').occurrences, [('.\\core\\templates\\core\\base.html', '40')])
+        self.assertEqual(po.find('New').msgstr, 'Neu')
+        self.assertEqual(po.find('Pricing').occurrences, [('.\\core\\templates\\core\\pricing.html', '7')])
+
+    def test_unchanged_catalog_is_not_modified(self):
+        po = self.catalog([('Home', 'Start', [('core/templates/core/base.html', '40')])])
+        files = {'core/templates/core/base.html': {'messages': [[None, 'Home', None, 40]]}}
+        self.assertFalse(extract_messages.update_catalog(po, files, set(files), {}))
+
+    def test_replaces_occurrence_without_line_number(self):
+        po = self.catalog([('Logout', 'Abmelden', [('.\\core\\templates\\core\\base.html:', '')])])
+        files = {'core/templates/core/base.html': {'messages': [[None, 'Logout', None, 102]]}}
+        extract_messages.update_catalog(po, files, set(files), {})
+        self.assertEqual(po.find('Logout').occurrences, [('.\\core\\templates\\core\\base.html', '102')])
+
+    def test_marks_unused_strings_obsolete(self):
+        po = self.catalog([('Gone', 'Weg', [('core/templates/core/chat.html', '26')])])
+        files = {'core/templates/core/chat.html': {'messages': []}}
+        extract_messages.update_catalog(po, files, set(files), {})
+        self.assertTrue(po.find('Gone', include_obsolete_entries=True).obsolete)
+
+
+class GatewayTests(SimpleTestCase):
+    def test_parse_fields(self):
+        self.assertEqual(gateway.parse_fields(''), gateway.DEFAULT_JOB_FIELDS)
+        self.assertEqual(gateway.parse_fields('title, company,salary'), ('urn', 'title', 'company'))
+        self.assertEqual(gateway.parse_fields('urn,title'), ('urn', 'title'))
+
+    def test_merge_dedupes_and_projects(self):
+        data = {
+            'career_field_search': {'jobs': [
+                {'job_urn': '1', 'job_title': ' Support ', 'company_name': 'A', 'insights': ['x'] * 50},
+                {'urn': '2', 'title': 'Admin', 'applyLink': 'https://a/2'},
+            ]},
+            'skills_search': {'jobs': [
+                {'urn': '1', 'title': 'Support (dup)'},
+                {'title': 'No urn'},
+            ]},
+        }
+        self.assertEqual(gateway.merge_jobs(data, ('urn', 'title', 'company', 'apply_link')), [
+            {'urn': '1', 'title': 'Support', 'company': 'A'},
+            {'urn': '2', 'title': 'Admin', 'apply_link': 'https://a/2'},
+            {'title': 'No urn'},
+        ])
+
+    def test_merge_tolerates_missing_searches(self):
+        self.assertEqual(gateway.merge_jobs({'skills_search': None}, gateway.DEFAULT_JOB_FIELDS), [])
+
+    def test_gzip_when_accepted(self):
+        payload = {'jobs': [{'title': 'Support'}] * 100}
+        request = RequestFactory().get('/api/jobs/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        with mock.patch.object(gateway, 'HAS_BROTLI', False):
+            response = gateway.compressed_json_response(request, payload)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), payload)
+
+    def test_small_or_unaccepted_bodies_are_not_compressed(self):
+        factory = RequestFactory()
+        small = gateway.compressed_json_response(factory.get('/', HTTP_ACCEPT_ENCODING='gzip'), {'jobs': []})
+        identity = gateway.compressed_json_response(factory.get('/'), {'jobs': [{'title': 'x'}] * 100})
+        for response in (small, identity):
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+
+@no_tracing
+class PrefetchTests(SimpleTestCase):
+    def setUp(self):
+        admission._controllers.clear()
+        prefetch._entries.clear()
+        backend.breaker.record_success()
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.cookies['csrftoken'] = 'a' * 32
+        self.scrape_calls = []
+        self.scrapes_running = 0
+        self.max_scrapes_running = 0
+        self.scrape_lock = threading.Lock()
+        self.release_scrape = threading.Event()
+        self.release_scrape.set()
+
+    def fake_backend(self, method, url, **kwargs):
+        if url.endswith('/extract-text'):
+            return backend_response({'saved_to_db': True})
+        with self.scrape_lock:
+            self.scrape_calls.append(kwargs['params']['city'])
+            self.scrapes_running += 1
+            self.max_scrapes_running = max(self.max_scrapes_running, self.scrapes_running)
+        if kwargs['params']['city'] == settings.PREFETCH_DEFAULT_CITY:
+            self.release_scrape.wait(5)
+        with self.scrape_lock:
+            self.scrapes_running -= 1
+        return backend_response({'career_field_search': {'jobs': [{'urn': kwargs['params']['city']}]}})
+
+    def upload_cv(self):
+        upload = SimpleUploadedFile('cv.pdf', b'%PDF-1.4 cv', content_type='application/pdf')
+        response = self.client.post('/api/extract-text/', {'file': upload},
+                                    HTTP_X_CSRFTOKEN='a' * 32, HTTP_AUTHORIZATION='Bearer t')
+        self.assertEqual(response.status_code, 200)
+        (entry,) = prefetch._entries.values()
+        return entry
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_jobs_page_uses_prefetch_started_by_upload(self):
+        with mock.patch.object(backend._session, 'request', side_effect=self.fake_backend):
+            entry = self.upload_cv()
+            self.wait_for(lambda: entry.state == prefetch.DONE)
+            response = self.client.get('/api/jobs/', {'city': settings.PREFETCH_DEFAULT_CITY},
+                                       HTTP_AUTHORIZATION='Bearer t')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['jobs'], [{'urn': settings.PREFETCH_DEFAULT_CITY}])
+        self.assertEqual(self.scrape_calls, [settings.PREFETCH_DEFAULT_CITY])
+        self.assertEqual(prefetch._entries, {})
+
+    def test_search_for_other_city_queues_behind_running_prefetch(self):
+        self.release_scrape.clear()
+        with mock.patch.object(backend._session, 'request', side_effect=self.fake_backend):
+            entry = self.upload_cv()
+            self.wait_for(lambda: entry.state == prefetch.RUNNING)
+            # The backend keeps scraping, so the prefetch keeps the only scraper slot
+            response = self.client.get('/api/jobs/', {'city': 'Bern'}, HTTP_AUTHORIZATION='Bearer t')
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(entry.state, prefetch.CANCELLED)
+            ticket = json.loads(response.content)['ticket']
+
+            self.release_scrape.set()
+            entry.future.result(5)
+            response = self.client.get('/api/jobs/', {'city': 'Bern'}, HTTP_AUTHORIZATION='Bearer t',
+                                       HTTP_X_ADMISSION_TICKET=ticket)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['jobs'], [{'urn': 'Bern'}])
+        self.assertEqual(self.max_scrapes_running, 1)
+        self.assertEqual(admission.get_controller('scraper').active, 0)
+
+    def test_claim_gives_up_on_a_prefetch_that_takes_too_long(self):
+        self.release_scrape.clear()
+        with mock.patch.object(backend._session, 'request', side_effect=self.fake_backend):
+            entry = self.upload_cv()
+            self.wait_for(lambda: entry.state == prefetch.RUNNING)
+            with override_settings(BACKEND_TIMEOUT=0.05):
+                response = self.client.get('/api/jobs/', {'city': settings.PREFETCH_DEFAULT_CITY},
+                                           HTTP_AUTHORIZATION='Bearer t')
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(entry.state, prefetch.CANCELLED)
+            self.release_scrape.set()
+            self.assertIsNone(entry.future.result(5))
+        self.assertEqual(admission.get_controller('scraper').active, 0)
+
+    def test_expired_entries_are_dropped_when_a_prefetch_starts(self):
+        with mock.patch.object(prefetch, '_get_executor'):
+            prefetch.start('a', {}, 'Bern')
+            prefetch._entries['a'].created -= settings.PREFETCH_TTL + 1
+            prefetch.start('b', {}, 'Bern')
+        self.assertEqual(list(prefetch._entries), ['b'])
+
+
+@no_tracing
+class FragmentTests(SimpleTestCase):
+    def test_extract_regions(self):
+        html = (
+            '<nav><a href="/" data-i18n-region="home">Start</a></nav>'
+            '<div data-i18n-region="card"><div class="x"><p>Hallo &amp; <b>Tschüss</b></p></div></div>'
+            '<input data-i18n-region="city" placeholder="z.B. Bern" value="Bern">'
+            '<button data-i18n-region="close" aria-label="Schließen" title="Zu" />'
+        )
+        self.assertEqual(fragments.extract_regions(html), {
+            'home': {'attrs': {}, 'html': 'Start'},
+            'card': {'attrs': {}, 'html': '<div class="x"><p>Hallo &amp; <b>Tschüss</b></p></div>'},
+            'city': {'attrs': {'placeholder': 'z.B. Bern'}},
+            'close': {'attrs': {'title': 'Zu', 'aria-label': 'Schließen'}},
+        })
+
+    def test_regions_on_multiple_lines(self):
+        html = '<main>\n  <p data-i18n-region="a">\n    Eins\n  </p>\n  <p data-i18n-region="b">Zwei</p>\n</main>'
+        regions = fragments.extract_regions(html)
+        self.assertEqual(regions['a']['html'], 'Eins')
+        self.assertEqual(regions['b']['html'], 'Zwei')
+
+    def test_fragments_endpoint_translates(self):
+        response = self.client.get('/i18n/fragments/', {'page': 'positions', 'language': 'de'})
+        self.assertEqual(response.status_code, 200)
+        regions = json.loads(response.content)['regions']
+        self.assertEqual(regions['positions-search']['html'], 'Suchen')
+
+
+@override_settings(BACKEND_BREAKER_FAILURE_THRESHOLD=3, BACKEND_BREAKER_RESET_TIMEOUT=15)
+class CircuitBreakerTests(SimpleTestCase):
+    def open_breaker(self):
+        breaker = backend.CircuitBreaker()
+        for _ in range(3):
+            self.assertTrue(breaker.allow())
+            breaker.record_failure()
+        return breaker
+
+    def test_opens_after_consecutive_failures(self):
+        breaker = self.open_breaker()
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_success_resets_the_count(self):
+        breaker = backend.CircuitBreaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_half_open_allows_one_probe(self):
+        breaker = self.open_breaker()
+        breaker.opened_at -= 16
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_opens_again(self):
+        breaker = self.open_breaker()
+        breaker.opened_at -= 16
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_health_check_does_not_clear_call_failures(self):
+        breaker = backend.CircuitBreaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_health_ok()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, breaker.OPEN)
+
+    def test_health_check_lets_open_circuit_probe_early(self):
+        breaker = self.open_breaker()
+        breaker.record_health_ok()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+    def test_health_check_resets_a_stale_probe(self):
+        breaker = self.open_breaker()
+        breaker.opened_at -= 16
+        self.assertTrue(breaker.allow())
+        breaker.record_health_ok()
+        self.assertFalse(breaker.allow())  # the probe may still answer
+        breaker._probe_started -= settings.BACKEND_TIMEOUT + 1
+        breaker.record_health_ok()
+        self.assertTrue(breaker.allow())
+
+    @no_tracing
+    async def test_cancelled_probe_opens_the_circuit_again(self):
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(60)
+
+        client = backend_client.BackendClient()
+        client.client = mock.Mock(request=hang)
+        client.loop = asyncio.get_running_loop()
+        breaker = self.open_breaker()
+        breaker.opened_at -= 16
+        with mock.patch.object(backend, 'breaker', breaker):
+            task = asyncio.create_task(client.request('GET', 'career-chat'))
+            await asyncio.sleep(0.01)
+            self.assertEqual(breaker.state, breaker.HALF_OPEN)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+        self.assertEqual(breaker.state, breaker.OPEN)
+        breaker.record_health_ok()
+        self.assertTrue(breaker.allow())
+
+    @no_tracing
+    def test_probe_failing_with_unexpected_error_opens_the_circuit_again(self):
+        breaker = self.open_breaker()
+        breaker.opened_at -= 16
+        with mock.patch.object(backend, 'breaker', breaker), \
+                mock.patch.object(backend._session, 'request', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                backend.call('GET', 'career-chat')
+        self.assertEqual(breaker.state, breaker.OPEN)
+        self.assertFalse(breaker._probing)
+
+    def test_backend_error_statuses_count_as_failures(self):
+        with mock.patch.object(backend, 'breaker', backend.CircuitBreaker()) as breaker:
+            for _ in range(3):
+                self.assertTrue(backend.record_status(503))
+            self.assertEqual(breaker.state, breaker.OPEN)
+            self.assertFalse(backend.record_status(404))
+            self.assertEqual(breaker.state, breaker.CLOSED)
+
+
+class BackendClientTests(SimpleTestCase):
+    @override_settings(BACKEND_HTTP2=True)
+    async def test_snapshot_reports_http1_fallback_without_h2(self):
+        client = backend_client.BackendClient()
+        with mock.patch.dict(sys.modules, {'h2': None}), \
+                mock.patch.object(client, '_health_loop', mock.AsyncMock()):
+            await client.start()
+        try:
+            self.assertFalse(client.snapshot()['pool']['http2'])
+        finally:
+            await client.stop()
@@ -0,0 +1,309 @@
+"""
+Request tracing across browser -> Django -> backend.
+
+Trace context is carried in the W3C ``traceparent`` header
+(``00-<trace_id>-<span_id>-<flags>``). The browser starts a trace per user
+action (see static/core/tracing.js), Django records a server span for every
+request it handles and a client span for every call it proxies to the
+backend, and all spans end up as JSON lines in a rotating file and,
+optionally, in an OTLP/HTTP collector.
+"""
+import contextvars
+import json
+import logging
+import queue
+import re
+import secrets
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_RE = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+
+# Hops a span can belong to, in the order a request travels through them
+HOPS = ('browser', 'django', 'backend')
+
+_current_span = contextvars.ContextVar('cv_current_span', default=None)
+
+
+def new_trace_id():
+    return secrets.token_hex(16)
+
+
+def new_span_id():
+    return secrets.token_hex(8)
+
+
+def parse_traceparent(value):
+    """Return ``(trace_id, parent_span_id)`` or ``None`` for a bad header."""
+    if not value:
+        return None
+    match = TRACEPARENT_RE.match(value.strip().lower())
+    if not match:
+        return None
+    trace_id, span_id, _flags = match.groups()
+    if trace_id == '0' * 32 or span_id == '0' * 16:
+        return None
+    return trace_id, span_id
+
+
+def format_traceparent(trace_id, span_id):
+    return f'00-{trace_id}-{span_id}-01'
+
+
+class Span:
+    def __init__(self, name, hop, kind, trace_id=None, parent_id=None, attributes=None):
+        self.name = name
+        self.hop = hop
+        self.kind = kind
+        self.trace_id = trace_id or new_trace_id()
+        self.span_id = new_span_id()
+        self.parent_id = parent_id
+        self.attributes = dict(attributes or {})
+        self.status = 'ok'
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration_ms = None
+
+    @property
+    def traceparent(self):
+        return format_traceparent(self.trace_id, self.span_id)
+
+    def finish(self):
+        self.duration_ms = round((time.perf_counter() - self._start_perf) * 1000, 3)
+        export_span(self.to_dict())
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'hop': self.hop,
+            'kind': self.kind,
+            'start': self.start,
+            'duration_ms': self.duration_ms,
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(name, hop, kind='internal', trace_id=None, parent_id=None, attributes=None):
+    """Open a span; it becomes the parent of anything started inside the block."""
+    parent = _current_span.get()
+    if trace_id is None and parent is not None:
+        trace_id = parent.trace_id
+        parent_id = parent.span_id
+    span = Span(name, hop, kind, trace_id=trace_id, parent_id=parent_id, attributes=attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except Exception as exc:
+        span.status = 'error'
+        span.attributes['error'] = type(exc).__name__
+        raise
+    finally:
+        _current_span.reset(token)
+        span.finish()
+
+
+@contextmanager
+def backend_span(method, url):
+    """Client span around a proxied backend call."""
+    with start_span(f'{method} {url}', hop='backend', kind='client',
+                    attributes={'http.method': method, 'http.url': url}) as span:
+        yield span
+
+
+def inject_headers(headers):
+    """Add the current trace context to outgoing backend request headers."""
+    span = _current_span.get()
+    if span is not None:
+        headers['traceparent'] = span.traceparent
+    return headers
+
+
+# ---------------------------------------------------------------------
+# EXPORT
+# ---------------------------------------------------------------------
+_span_logger = None
+_span_logger_lock = threading.Lock()
+_otlp_queue = None
+
+
+def _get_span_logger():
+    global _span_logger
+    if _span_logger is not None:
+        return _span_logger
+    with _span_logger_lock:
+        if _span_logger is None:
+            path = settings.TRACE_EXPORT_PATH
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=settings.TRACE_EXPORT_MAX_BYTES,
+                backupCount=settings.TRACE_EXPORT_BACKUP_COUNT,
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            span_logger = logging.getLogger('core.tracing.spans')
+            span_logger.setLevel(logging.INFO)
+            span_logger.propagate = False
+            span_logger.addHandler(handler)
+            _span_logger = span_logger
+    return _span_logger
+
+
+def export_span(span):
+    if not settings.TRACE_ENABLED:
+        return
+    try:
+        _get_span_logger().info(json.dumps(span, separators=(',', ':')))
+    except OSError as exc:
+        logger.warning('Could not write span: %s', exc)
+    if settings.TRACE_OTLP_ENDPOINT:
+        _enqueue_otlp(span)
+
+
+def _enqueue_otlp(span):
+    global _otlp_queue
+    if _otlp_queue is None:
+        with _span_logger_lock:
+            if _otlp_queue is None:
+                _otlp_queue = queue.Queue(maxsize=1000)
+                threading.Thread(target=_otlp_worker, name='otlp-exporter', daemon=True).start()
+    try:
+        _otlp_queue.put_nowait(span)
+    except queue.Full:
+        pass  # dropping spans is better than blocking requests
+
+
+def _otlp_worker():
+    while True:
+        batch = [_otlp_queue.get()]
+        while len(batch) < 100:
+            try:
+                batch.append(_otlp_queue.get_nowait())
+            except queue.Empty:
+                break
+        body = json.dumps(_to_otlp(batch)).encode('utf-8')
+        request = urllib.request.Request(
+            settings.TRACE_OTLP_ENDPOINT,
+            data=body,
+            headers={'Content-Type': 'application/json'},
+            method='POST',
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except OSError as exc:
+            logger.warning('OTLP export failed: %s', exc)
+
+
+def _to_otlp(spans):
+    """Convert spans to an OTLP/HTTP JSON ``ExportTraceServiceRequest``."""
+    kinds = {'internal': 1, 'server': 2, 'client': 3}
+    otlp_spans = []
+    for span in spans:
+        start_ns = int(span['start'] * 1e9)
+        end_ns = start_ns + int((span['duration_ms'] or 0) * 1e6)
+        attributes = [{'key': 'cv.hop', 'value': {'stringValue': span['hop']}}]
+        attributes += [
+            {'key': key, 'value': {'stringValue': str(value)}}
+            for key, value in span['attributes'].items()
+        ]
+        otlp_spans.append({
+            'traceId': span['trace_id'],
+            'spanId': span['span_id'],
+            'parentSpanId': span['parent_span_id'] or '',
+            'name': span['name'],
+            'kind': kinds.get(span['kind'], 1),
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(end_ns),
+            'attributes': attributes,
+            'status': {'code': 2 if span['status'] == 'error' else 1},
+        })
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [
+                {'key': 'service.name', 'value': {'stringValue': 'careervision-frontend'}},
+            ]},
+            'scopeSpans': [{'scope': {'name': 'core.tracing'}, 'spans': otlp_spans}],
+        }],
+    }
+
+
+def read_spans(path=None):
+    """Yield exported spans from the rotating files, oldest file first."""
+    path = path or settings.TRACE_EXPORT_PATH
+    files = [path.with_name(f'{path.name}.{i}') for i in range(settings.TRACE_EXPORT_BACKUP_COUNT, 0, -1)]
+    files.append(path)
+    for file in files:
+        if not file.exists():
+            continue
+        with open(file, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+# ---------------------------------------------------------------------
+# MIDDLEWARE
+# ---------------------------------------------------------------------
+class TraceMiddleware:
+    """Record a server span per request, continuing the caller's trace."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self._traced(request):
+            return self.get_response(request)
+        with self._server_span(request) as span:
+            response = self.get_response(request)
+            self._finish(span, response)
+        return response
+
+    async def __acall__(self, request):
+        if not self._traced(request):
+            return await self.get_response(request)
+        with self._server_span(request) as span:
+            response = await self.get_response(request)
+            self._finish(span, response)
+        return response
+
+    def _traced(self, request):
+        return settings.TRACE_ENABLED and not request.path.startswith(settings.TRACE_EXCLUDE_PATHS)
+
+    def _server_span(self, request):
+        parent = parse_traceparent(request.headers.get('traceparent'))
+        trace_id, parent_id = parent if parent else (None, None)
+        attributes = {'http.method': request.method, 'http.path': request.path}
+        return start_span(f'{request.method} {request.path}', hop='django', kind='server',
+                          trace_id=trace_id, parent_id=parent_id, attributes=attributes)
+
+    def _finish(self, span, response):
+        span.attributes['http.status_code'] = response.status_code
+        if response.status_code >= 500:
+            span.status = 'error'
+        response['traceresponse'] = span.traceparent
@@ -8,4 +8,14 @@ urlpatterns = [
     path('chat/', views.chat, name='chat'),
     path('positions/', views.positions, name='positions'),
     path('favorites/', views.favorites, name='favorites'),
+    path('trace/spans/', views.trace_spans, name='trace_spans'),
+    path('i18n/fragments/', views.i18n_fragments, name='i18n_fragments'),
+
+    # backend calls that go through admission control
+    path('api/career-chat/', views.career_chat_proxy, name='career_chat_proxy'),
+    path('api/extract-text/', views.extract_text_proxy, name='extract_text_proxy'),
+    path('api/scrape-jobs/', views.scrape_jobs_proxy, name='scrape_jobs_proxy'),
+    path('api/jobs/', views.jobs_gateway, name='jobs_gateway'),
+    path('api/queue/<str:backend_name>/<str:ticket>/', views.queue_status, name='queue_status'),
+    path('api/backend/metrics/', views.backend_metrics, name='backend_metrics'),
 ]
@@ -1,4 +1,14 @@
+import json
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from . import backend, backend_client, fragments, gateway, prefetch, tracing
+from .admission import admission, client_key, decision_response, get_controller, user_key
 
 def how_it_works(request):
     return render(request, 'core/how_it_works.html')
@@ -15,9 +25,165 @@ def chat(request):
 
 def positions(request):
     # Jobs are now fetched via JavaScript from the backend API
-    return render(request, 'core/positions.html')
+    return render(request, 'core/positions.html', {'job_city': prefetch.job_city(request)})
 
 
 def favorites(request):
     # Favorite jobs are rendered on the client from localStorage + backend
     return render(request, 'core/favorites.html')
+
+
+@require_GET
+def i18n_fragments(request):
+    # Translated static regions of a page, used by i18n.js to switch language in place
+    page = request.GET.get('page')
+    language = request.GET.get('language')
+    if page not in fragments.PAGE_TEMPLATES or language not in dict(settings.LANGUAGES):
+        return HttpResponseBadRequest('Unknown page or language')
+
+    response = JsonResponse({
+        'language': language,
+        'regions': fragments.get_fragments(request, page, language),
+    })
+    # Same cookie as django.views.i18n.set_language
+    response.set_cookie(
+        settings.LANGUAGE_COOKIE_NAME, language,
+        max_age=settings.LANGUAGE_COOKIE_AGE,
+        path=settings.LANGUAGE_COOKIE_PATH,
+        domain=settings.LANGUAGE_COOKIE_DOMAIN,
+        secure=settings.LANGUAGE_COOKIE_SECURE,
+        httponly=settings.LANGUAGE_COOKIE_HTTPONLY,
+        samesite=settings.LANGUAGE_COOKIE_SAMESITE,
+    )
+    patch_cache_control(response, private=True, max_age=settings.I18N_FRAGMENT_CACHE_TIMEOUT)
+    return response
+
+
+@csrf_exempt  # sent with navigator.sendBeacon, which cannot attach a CSRF header
+@require_POST
+def trace_spans(request):
+    # Browser spans from tracing.js, one per user action
+    try:
+        spans = json.loads(request.body)
+    except ValueError:
+        return HttpResponseBadRequest('Invalid JSON')
+    if not isinstance(spans, list):
+        spans = [spans]
+
+    for span in spans[:50]:
+        if not isinstance(span, dict):
+            continue
+        if not tracing.parse_traceparent(f"00-{span.get('trace_id')}-{span.get('span_id')}-01"):
+            continue
+        try:
+            start = float(span.get('start', 0)) / 1000  # ms since epoch in JS
+            duration_ms = float(span.get('duration_ms', 0))
+        except (TypeError, ValueError):
+            continue
+        attributes = span.get('attributes')
+        if not isinstance(attributes, dict):
+            attributes = {}
+        tracing.export_span({
+            'trace_id': span['trace_id'],
+            'span_id': span['span_id'],
+            'parent_span_id': None,
+            'name': str(span.get('name', 'action'))[:100],
+            'hop': 'browser',
+            'kind': 'client',
+            'start': start,
+            'duration_ms': duration_ms,
+            'status': 'error' if span.get('status') == 'error' else 'ok',
+            'attributes': {
+                str(key)[:50]: value if isinstance(value, (bool, int, float)) else str(value)[:200]
+                for key, value in list(attributes.items())[:20]
+            },
+        })
+    return HttpResponse(status=204)
+
+
+# --- Backend proxies behind admission control (see core/admission.py) ---
+# Async, so they share the pooled backend client started by the ASGI lifespan
+@require_POST
+@admission('llm')
+async def career_chat_proxy(request):
+    return await backend_client.proxy(request, 'career-chat')
+
+
+@require_POST
+@admission('llm')
+async def extract_text_proxy(request):
+    response = await backend_client.proxy(request, 'extract-text')
+    if response.status_code == 200:
+        # Users go from the CV analysis straight to positions, start that search now
+        prefetch.after_cv_upload(request, response)
+    return response
+
+
+@require_GET
+@admission('scraper')
+async def scrape_jobs_proxy(request):
+    return await backend_client.proxy(request, 'scrape-jobs')
+
+
+@require_GET
+async def jobs_gateway(request):
+    # Deduplicated, field-projected and compressed job list for positions.js
+    city = request.GET.get('city', '')
+    max_pages = request.GET.get('max_pages', '1')
+
+    # Attach to the search started after the CV upload, if there is one
+    prefetched = await prefetch.claim(user_key(request), city, max_pages)
+    if prefetched is not None:
+        response = _jobs_response(request, *prefetched, city, max_pages)
+    else:
+        response = await _search_jobs(request, city, max_pages)
+
+    if response.status_code == 200 and city:
+        # Remembered for the next prefetch and as the default city of the page
+        response.set_cookie(settings.JOB_CITY_COOKIE, city, max_age=365 * 24 * 3600, samesite='Lax')
+    return response
+
+
+@admission('scraper')
+async def _search_jobs(request, city, max_pages):
+    try:
+        resp = await backend_client.client.request('GET', 'scrape-jobs', backend.forwarded_headers(request),
+                                                   params={'city': city, 'max_pages': max_pages})
+        data = resp.json()
+    except (backend.BackendUnavailable, ValueError):
+        return backend.unavailable_response()
+    return _jobs_response(request, resp.status_code, data, city, max_pages)
+
+
+def _jobs_response(request, status, data, city, max_pages):
+    if status != 200:
+        return gateway.compressed_json_response(request, data, status=status)
+
+    fields = gateway.parse_fields(request.GET.get('fields'))
+    jobs = gateway.merge_jobs(data, fields)
+    return gateway.compressed_json_response(request, {
+        'city': data.get('city', city),
+        'max_pages': data.get('max_pages', max_pages),
+        'total_jobs': len(jobs),
+        'jobs': jobs,
+    })
+
+
+@require_GET
+def queue_status(request, backend_name, ticket):
+    # Polled by admission.js while a request waits for a free slot
+    if backend_name not in settings.ADMISSION_BACKENDS:
+        raise Http404('Unknown backend')
+    decision = get_controller(backend_name).status(client_key(request), ticket)
+    return decision_response(backend_name, decision)
+
+
+@require_GET
+def backend_metrics(request):
+    # Pool usage, circuit breaker, health check and admission queues
+    if not settings.DEBUG and not request.user.is_staff:
+        raise Http404
+    return JsonResponse({
+        **backend_client.client.snapshot(),
+        'admission': [get_controller(name).snapshot() for name in settings.ADMISSION_BACKENDS],
+    })
@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+"""
+Incrementally extract translatable strings into the .po files.
+
+Walks core/templates and core/static/core, remembers a hash and the
+extracted messages of every file in a cache, and only re-parses files that
+changed since the last run. Only the catalog entries of those files are
+touched: new strings are added (translated if update_translations.py has
+a TRANSLATIONS entry for them, otherwise empty), occurrences are updated, and
+strings no longer used anywhere are marked obsolete.
+
+Usage:
+    python translationFunctions/extract_messages.py           # update .po files
+    python translationFunctions/extract_messages.py --full    # ignore the cache
+    python translationFunctions/extract_messages.py --check   # CI: exit 1 if out of date
+
+Then run compile_translations.py to rebuild the .mo files.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+try:
+    import polib
+    HAS_POLIB = True
+except ImportError:
+    HAS_POLIB = False
+
+# Hand-written translations are still the source for new msgstrs
+from update_translations import TRANSLATIONS
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+LOCALE_DIR = BASE_DIR / 'locale'
+CACHE_PATH = BASE_DIR / '.i18n_cache.json'
+CACHE_VERSION = 1
+
+# (directory, file suffixes, parser name)
+SOURCES = [
+    (BASE_DIR / 'core' / 'templates', ('.html', '.txt'), 'template'),
+    (BASE_DIR / 'core' / 'static' / 'core', ('.js',), 'javascript'),
+]
+
+LANGUAGES = ['de', 'kk', 'lv', 'pl', 'ru']
+
+# function name -> (has context, has plural)
+GETTEXT_FUNCTIONS = {
+    'gettext': (False, False),
+    'gettext_noop': (False, False),
+    'ngettext': (False, True),
+    'pgettext': (True, False),
+    'npgettext': (True, True),
+}
+
+CALL_RE = re.compile(r'\b(gettext|ngettext|pgettext|npgettext|gettext_noop)\s*\(')
+# A string literal argument followed by ',' or ')'; templatize() emits u'...' literals
+STRING_ARG_RE = re.compile(r'\s*(u?\'(?:\\.|[^\'\\])*\'|u?"(?:\\.|[^"\\])*")\s*(,|\))')
+
+
+# ---------------------------------------------------------------------
+# PARSING
+# ---------------------------------------------------------------------
+def parse_template(source, path):
+    """Extract messages from a Django template.
+
+    Uses Django's own templatize(), which turns {% trans %} / {% blocktrans %}
+    into gettext() calls on the original line numbers, so the msgids match
+    what makemessages would produce.
+    """
+    from django.utils.translation.template import templatize
+    return parse_gettext_calls(templatize(source, str(path)))
+
+
+def parse_javascript(source, path):
+    """Extract gettext()-style calls (Django's JavaScript catalog API)."""
+    return parse_gettext_calls(source)
+
+
+def parse_gettext_calls(code):
+    """Find gettext(), ngettext(), pgettext()... calls with literal string arguments."""
+    messages = []
+    for match in CALL_RE.finditer(code):
+        args = []
+        pos = match.end()
+        while True:
+            arg = STRING_ARG_RE.match(code, pos)
+            if not arg:
+                break
+            args.append(ast.literal_eval(arg.group(1).lstrip('u')))
+            pos = arg.end()
+            if arg.group(2) == ')':
+                break
+        line = code.count('\n', 0, match.start()) + 1
+        message = make_message(match.group(1), args, line)
+        if message:
+            messages.append(message)
+    return messages
+
+
+def make_message(function, args, line):
+    """Return [msgctxt, msgid, msgid_plural, line] or None for non-literal calls."""
+    has_context, has_plural = GETTEXT_FUNCTIONS[function]
+    needed = 1 + has_context + has_plural
+    if len(args) < needed:
+        return None
+    context = args[0] if has_context else None
+    msgid = args[1 if has_context else 0]
+    plural = args[needed - 1] if has_plural else None
+    if not msgid:
+        return None
+    return [context, msgid, plural, line]
+
+
+PARSERS = {
+    'template': parse_template,
+    'javascript': parse_javascript,
+}
+
+
+# ---------------------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------------------
+def load_cache():
+    try:
+        with open(CACHE_PATH, encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == CACHE_VERSION:
+            return cache
+    except (OSError, ValueError):
+        pass
+    return {'version': CACHE_VERSION, 'files': {}, 'languages': []}
+
+
+def save_cache(cache):
+    with open(CACHE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+
+
+def scan_sources(cache, full=False):
+    """Return ({path: messages} for all files, set of changed paths)."""
+    current = {}
+    changed = set()
+    for directory, suffixes, parser in SOURCES:
+        for file in sorted(directory.rglob('*')):
+            if not file.is_file() or file.suffix not in suffixes:
+                continue
+            rel = file.relative_to(BASE_DIR).as_posix()
+            data = file.read_bytes()
+            digest = hashlib.sha1(data).hexdigest()
+            cached = cache['files'].get(rel)
+            if not full and cached and cached['hash'] == digest:
+                current[rel] = cached
+                continue
+            messages = PARSERS[parser](data.decode('utf-8'), rel)
+            current[rel] = {'hash': digest, 'messages': messages}
+            changed.add(rel)
+
+    # Deleted files also change the catalogs
+    changed.update(set(cache['files']) - set(current))
+    return current, changed
+
+
+# ---------------------------------------------------------------------
+# CATALOG UPDATE
+# ---------------------------------------------------------------------
+def normalize_path(path):
+    # polib reads an occurrence without a line number as ('.\core\...\base.html:', '')
+    return path.replace('\\', '/').lstrip('./').rstrip(':')
+
+
+def sort_occurrences(occurrences):
+    unique = {(path, str(line)) for path, line in occurrences}
+    return sorted(unique, key=lambda occ: (normalize_path(occ[0]), int(occ[1] or 0)))
+
+
+def occurrence_style(po):
+    """Keep the path style already used in the catalog (.\\core\\... on Windows)."""
+    for entry in po:
+        for path, _line in entry.occurrences:
+            if path.startswith('.\\'):
+                return lambda rel: '.\\' + rel.replace('/', '\\')
+    return lambda rel: rel
+
+
+def update_catalog(po, files, changed, translations):
+    """Apply the messages of the changed files to a catalog; return True if modified."""
+    format_path = occurrence_style(po)
+    entries = {(e.msgctxt, e.msgid): e for e in po}
+
+    # Which strings each changed file uses now
+    new_occurrences = {}
+    for rel in changed:
+        for context, msgid, plural, line in files.get(rel, {}).get('messages', []):
+            new_occurrences.setdefault((context, msgid, plural), []).append((format_path(rel), str(line)))
+
+    # Strings still used by any scanned file (changed or not)
+    used = {(m[0], m[1]) for data in files.values() for m in data['messages']}
+
+    modified = False
+    for entry in po:
+        kept = [occ for occ in entry.occurrences if normalize_path(occ[0]) not in changed]
+        if len(kept) == len(entry.occurrences):
+            continue
+        added = new_occurrences.pop((entry.msgctxt, entry.msgid, entry.msgid_plural or None), [])
+        occurrences = sort_occurrences(kept + added)
+        if occurrences != sort_occurrences(entry.occurrences):
+            entry.occurrences = occurrences
+            modified = True
+        if not occurrences and not entry.obsolete and (entry.msgctxt, entry.msgid) not in used:
+            entry.obsolete = True
+            modified = True
+
+    # Strings that are new, moved into a changed file, or coming back from obsolete
+    for (context, msgid, plural), occurrences in new_occurrences.items():
+        entry = entries.get((context, msgid))
+        if entry is None:
+            entry = polib.POEntry(msgctxt=context, msgid=msgid, msgstr=translations.get(msgid, ''))
+            if plural:
+                entry.msgid_plural = plural
+                entry.msgstr_plural = {0: '', 1: ''}
+            po.append(entry)
+            entries[(context, msgid)] = entry
+        occurrences = sort_occurrences(entry.occurrences + occurrences)
+        if entry.obsolete or occurrences != sort_occurrences(entry.occurrences):
+            entry.obsolete = False
+            entry.occurrences = occurrences
+            modified = True
+
+    return modified
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--full', action='store_true', help='re-parse every file, ignoring the cache')
+    parser.add_argument('--check', action='store_true', help='do not write, exit 1 if catalogs are out of date')
+    args = parser.parse_args()
+
+    if not HAS_POLIB:
+        print("=" * 60)
+        print("polib library is required to update translations.")
+        print("Install it with: pip install polib")
+        print("=" * 60)
+        return 1
+
+    started = time.perf_counter()
+    cache = load_cache()
+    files, changed = scan_sources(cache, full=args.full)
+    updated = []
+
+    for lang in LANGUAGES:
+        po_file = LOCALE_DIR / lang / 'LC_MESSAGES' / 'django.po'
+        if not po_file.exists():
+            print(f"⚠ Warning: {po_file} not found, skipping...")
+            continue
+        # A language the cache has never seen needs every file applied once
+        lang_changed = changed if lang in cache['languages'] else set(files) | changed
+        if not lang_changed:
+            continue
+        po = polib.pofile(str(po_file))
+        if update_catalog(po, files, lang_changed, TRANSLATIONS.get(lang, {})):
+            updated.append(lang)
+            if not args.check:
+                po.save(str(po_file))
+
+    elapsed = (time.perf_counter() - started) * 1000
+    if args.check:
+        if updated:
+            print(f"✗ Catalogs out of date ({', '.join(updated)}); changed files: {', '.join(sorted(changed)) or '-'}")
+            return 1
+        print(f"✓ Catalogs up to date ({elapsed:.0f} ms)")
+        return 0
+
+    cache['files'] = files
+    cache['languages'] = sorted(set(cache['languages']) | {
+        lang for lang in LANGUAGES if (LOCALE_DIR / lang / 'LC_MESSAGES' / 'django.po').exists()
+    })
+    save_cache(cache)
+
+    print(f"✓ {len(changed)} changed file(s), {len(updated)} catalog(s) updated in {elapsed:.0f} ms")
+    for rel in sorted(changed):
+        print(f"  - {rel}")
+    if updated:
+        print("Now run: python compile_translations.py")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())